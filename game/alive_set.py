@@ -0,0 +1,88 @@
+# Handles pack a slot index in the low bits and the slot's generation above it
+SLOT_BITS = 20
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class AliveSet:
+    """The living units of one team, stored densely, with stable integer handles.
+
+    Iterating walks a plain list of living units only. A unit that dies is
+    swap-removed at once (the last unit moves into its place), so it drops
+    out of every later loop without a per-tick rebuild. add() gives each
+    unit a handle: its slot index plus the slot's generation, which is
+    bumped whenever the slot is freed. get(handle) is therefore an O(1)
+    "still alive?" check that stays correct after the slot is reused.
+
+    Removing while iterating the same set skips the unit swapped into the
+    hole, so code that can kill members of a set it is looping over (e.g.
+    splash damage) must collect the victims first.
+    """
+
+    def __init__(self, units=()):
+        self.units = []          # Dense: living units only, in no particular order
+        self._slots = []         # Dense index -> slot
+        self._dense = []         # Slot -> dense index
+        self._slot_units = []    # Slot -> unit, None while free
+        self._generations = []   # Slot -> generation
+        self._free = []
+        self.extend(units)
+
+    def add(self, unit):
+        if not unit.alive:
+            return None
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._slot_units)
+            self._slot_units.append(None)
+            self._generations.append(0)
+            self._dense.append(0)
+        self._slot_units[slot] = unit
+        self._dense[slot] = len(self.units)
+        self.units.append(unit)
+        self._slots.append(slot)
+        unit.alive_set = self
+        unit.handle = (self._generations[slot] << SLOT_BITS) | slot
+        return unit.handle
+
+    def extend(self, units):
+        for unit in units:
+            self.add(unit)
+
+    def remove(self, unit):
+        slot = unit.handle & SLOT_MASK
+        if self._slot_units[slot] is not unit:
+            return
+        index = self._dense[slot]
+        last = self.units.pop()
+        last_slot = self._slots.pop()
+        if last is not unit:
+            self.units[index] = last
+            self._slots[index] = last_slot
+            self._dense[last_slot] = index
+        self._slot_units[slot] = None
+        self._generations[slot] += 1
+        self._free.append(slot)
+        unit.alive_set = None
+
+    def get(self, handle):
+        """The unit behind a handle, or None if it has died since the handle was taken."""
+        slot = handle & SLOT_MASK
+        if slot < len(self._generations) and self._generations[slot] == handle >> SLOT_BITS:
+            return self._slot_units[slot]
+        return None
+
+    def __contains__(self, unit):
+        return unit.alive_set is self
+
+    def __iter__(self):
+        return iter(self.units)
+
+    def __len__(self):
+        return len(self.units)
+
+    def __add__(self, other):
+        return self.units + list(other)
+
+    def __repr__(self):
+        return f"AliveSet({len(self.units)} alive)"
@@ -27,12 +27,24 @@ class Board:
         else:
             self.window_width = window_width
             self.window_height = window_height
+        self.tile_size, self.x_offset, self.y_offset = self.layout(self.window_width, self.window_height)
+
+    @classmethod
+    def layout(cls, window_width, window_height):
+        """(tile_size, x_offset, y_offset) of the board centered in a window of that size."""
         # Scale board to 90% of window size for margin
         board_scale = 0.9
-        scaled_width = int(self.window_width * board_scale)
-        scaled_height = int(self.window_height * board_scale)
-        tile_size = min(scaled_width // self.TOTAL_WIDTH, scaled_height // self.TOTAL_HEIGHT)
-        self.tile_size = tile_size
+        scaled_width = int(window_width * board_scale)
+        scaled_height = int(window_height * board_scale)
+        tile_size = min(scaled_width // cls.TOTAL_WIDTH, scaled_height // cls.TOTAL_HEIGHT)
+        x_offset = (window_width - tile_size * cls.TOTAL_WIDTH) // 2
+        y_offset = (window_height - tile_size * cls.TOTAL_HEIGHT) // 2
+        return tile_size, x_offset, y_offset
+
+    @property
+    def metrics(self):
+        """(tile_size, x_offset, y_offset): the board pixels units and the simulation work in."""
+        return self.tile_size, self.x_offset, self.y_offset
 
     def toggle_grid(self):
         self.show_grid = not self.show_grid
@@ -42,51 +54,46 @@ class Board:
         return self.tile_size
 
 
-    def draw(self, surface):
-        # window_width, window_height = surface.get_size()
-        # # Scale board to 90% of window size for margin
-        # board_scale = 0.9
-        # scaled_width = int(window_width * board_scale)
-        # scaled_height = int(window_height * board_scale)
-        # tile_size = min(scaled_width // self.TOTAL_WIDTH, scaled_height // self.TOTAL_HEIGHT)
-        # self.tile_size = tile_size
-        board_width = self.tile_size * self.TOTAL_WIDTH
-        board_height = self.tile_size * self.TOTAL_HEIGHT
-        x_offset = (self.window_width - board_width) // 2
-        y_offset = (self.window_height - board_height) // 2    
+    def draw(self, surface, viewport=None):
+        if viewport is not None:
+            # Lay the board out in screen space through the shared camera transform
+            tile_size = max(1, int(round(viewport.tile_size * viewport.scale)))
+            x_offset, y_offset = (int(v) for v in viewport.world_to_screen((viewport.x_offset, viewport.y_offset)))
+        else:
+            tile_size, x_offset, y_offset = self.metrics
 
         # Section rectangles
         # Left side section (4x20)
         left_rect = pygame.Rect(
             x_offset,
             y_offset,
-            self.SIDE_WIDTH * self.tile_size,
-            self.TOTAL_HEIGHT * self.tile_size
+            self.SIDE_WIDTH * tile_size,
+            self.TOTAL_HEIGHT * tile_size
         )
         # Right side section (4x20)
         right_rect = pygame.Rect(
-            x_offset + (self.SIDE_WIDTH + self.MAIN_WIDTH) * self.tile_size,
+            x_offset + (self.SIDE_WIDTH + self.MAIN_WIDTH) * tile_size,
             y_offset,
-            self.SIDE_WIDTH * self.tile_size,
-            self.TOTAL_HEIGHT * self.tile_size
+            self.SIDE_WIDTH * tile_size,
+            self.TOTAL_HEIGHT * tile_size
         )
 
         # Ensure right_rect is fully inside the window
-        if right_rect.right > x_offset + self.TOTAL_WIDTH * self.tile_size:
-            right_rect.width -= (right_rect.right - (x_offset + self.TOTAL_WIDTH * self.tile_size))
+        if right_rect.right > x_offset + self.TOTAL_WIDTH * tile_size:
+            right_rect.width -= (right_rect.right - (x_offset + self.TOTAL_WIDTH * tile_size))
         # Top main section (10x10)
         top_rect = pygame.Rect(
-            x_offset + self.SIDE_WIDTH * self.tile_size,
+            x_offset + self.SIDE_WIDTH * tile_size,
             y_offset,
-            self.MAIN_WIDTH * self.tile_size,
-            self.HEIGHT * self.tile_size
+            self.MAIN_WIDTH * tile_size,
+            self.HEIGHT * tile_size
         )
         # Bottom main section (10x10)
         bottom_rect = pygame.Rect(
-            x_offset + self.SIDE_WIDTH * self.tile_size,
-            y_offset + self.HEIGHT * self.tile_size,
-            self.MAIN_WIDTH * self.tile_size,
-            self.HEIGHT * self.tile_size
+            x_offset + self.SIDE_WIDTH * tile_size,
+            y_offset + self.HEIGHT * tile_size,
+            self.MAIN_WIDTH * tile_size,
+            self.HEIGHT * tile_size
         )
 
         # Draw main section outlines
@@ -111,30 +118,30 @@ class Board:
         if self.show_grid:
             # Top and bottom main sections
             # Draw top section grid lines as usual
-            for x in range(top_rect.left, top_rect.right, self.tile_size):
+            for x in range(top_rect.left, top_rect.right, tile_size):
                 pygame.draw.line(surface, self.GRID_COLOR, (x, top_rect.top), (x, top_rect.bottom), 1)
             pygame.draw.line(surface, self.GRID_COLOR, (top_rect.right, top_rect.top), (top_rect.right, top_rect.bottom), 1)
-            for y in range(top_rect.top, top_rect.bottom, self.tile_size):
+            for y in range(top_rect.top, top_rect.bottom, tile_size):
                 pygame.draw.line(surface, self.GRID_COLOR, (top_rect.left, y), (top_rect.right, y), 1)
             # Draw the last horizontal line at the bottom edge of the top section
             pygame.draw.line(surface, self.GRID_COLOR, (top_rect.left, top_rect.bottom - 1), (top_rect.right, top_rect.bottom - 1), 1)
 
             # Draw bottom section grid lines, but skip the first horizontal line (shared with top)
-            for x in range(bottom_rect.left, bottom_rect.right, self.tile_size):
+            for x in range(bottom_rect.left, bottom_rect.right, tile_size):
                 pygame.draw.line(surface, self.GRID_COLOR, (x, bottom_rect.top), (x, bottom_rect.bottom), 1)
             pygame.draw.line(surface, self.GRID_COLOR, (bottom_rect.right, bottom_rect.top), (bottom_rect.right, bottom_rect.bottom), 1)
-            for y in range(bottom_rect.top + self.tile_size, bottom_rect.bottom, self.tile_size):
+            for y in range(bottom_rect.top + tile_size, bottom_rect.bottom, tile_size):
                 pygame.draw.line(surface, self.GRID_COLOR, (bottom_rect.left, y), (bottom_rect.right, y), 1)
             # Draw the last horizontal line at the bottom edge of the bottom section
             pygame.draw.line(surface, self.GRID_COLOR, (bottom_rect.left, bottom_rect.bottom - 1), (bottom_rect.right, bottom_rect.bottom - 1), 1)
 
             # Left and right side sections
             for section in [left_rect, right_rect]:
-                for x in range(section.left, section.right, self.tile_size):
+                for x in range(section.left, section.right, tile_size):
                     pygame.draw.line(surface, self.GRID_COLOR, (x, section.top), (x, section.bottom), 1)
                 # Draw the last vertical line at the right edge
                 pygame.draw.line(surface, self.GRID_COLOR, (section.right, section.top), (section.right, section.bottom), 1)
-                for y in range(section.top, section.bottom, self.tile_size):
+                for y in range(section.top, section.bottom, tile_size):
                     pygame.draw.line(surface, self.GRID_COLOR, (section.left, y), (section.right, y), 1)
                 # Draw the last horizontal line at the bottom edge
                 pygame.draw.line(surface, self.GRID_COLOR, (section.left, section.bottom - 1), (section.right, section.bottom - 1), 1)
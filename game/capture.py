@@ -0,0 +1,226 @@
+import os
+import shutil
+import subprocess
+import threading
+
+import numpy as np
+import pygame
+
+from game.simulation import Battle, MAX_BATTLE_TIME
+from game.viewport import Viewport
+
+
+def init_headless():
+    """Use SDL's dummy video driver so surfaces can be rendered without a window."""
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+
+
+class BattleRenderer:
+    """Draws a headless Battle onto an offscreen surface of any size.
+
+    Rendering goes through a Viewport fitted to the surface, so a small
+    observation-sized surface gets the whole board scaled down, exactly as
+    a resized window would.
+    """
+
+    def __init__(self, battle, width=None, height=None, background=(30, 30, 30)):
+        self.battle = battle
+        width = width or battle.board.window_width
+        height = height or battle.board.window_height
+        self.surface = pygame.Surface((width, height))
+        self.viewport = Viewport(battle.board, width, height)
+        self.background = background
+
+    def render(self):
+        battle = self.battle
+        surface = self.surface
+        viewport = self.viewport
+        surface.fill(self.background)
+        battle.board.draw(surface, viewport)
+        tile_size, x_offset, y_offset = viewport.metrics
+        for team in (battle.team0, battle.team1):
+            for unit in team:
+                unit.update_rect_position(tile_size, x_offset, y_offset)
+                if viewport.is_visible(unit.rect):
+                    unit.draw(surface, viewport)
+        for projectile in battle.projectiles:
+            if viewport.is_point_visible(projectile.pos, 6):
+                projectile.draw(surface, viewport)
+        return surface
+
+
+class FrameCapture:
+    """Copies rendered frames into a preallocated ring buffer; a writer thread drains it.
+
+    capture() copies the surface's pixels (via a surfarray view, no
+    intermediate array) into the next free slot as (height, width, 3)
+    uint8 and returns at once. The writer thread hands each frame to
+    sink(frame, index) and only then releases the slot. If the writer
+    falls a whole buffer behind, new frames are dropped (and counted)
+    rather than stalling the simulation. latest() exposes the newest frame
+    for pixel observations without going through the sink.
+    """
+
+    def __init__(self, width, height, sink=None, capacity=64, stride=1):
+        self.width = width
+        self.height = height
+        self.sink = sink
+        self.capacity = capacity
+        self.stride = stride                  # Capture every Nth call to capture()
+        self.frames = np.zeros((capacity, height, width, 3), dtype=np.uint8)
+        self.indices = [0] * capacity         # Frame index (capture() call count) per slot
+        self.dropped = 0
+        self.written = 0
+        self._calls = 0
+        self._head = 0                        # Frames stored
+        self._tail = 0                        # Frames handed to the sink
+        self._wake = threading.Condition()
+        self._stop = False
+        self._thread = None
+        if sink is not None:
+            self._thread = threading.Thread(target=self._run, name="frame-capture", daemon=True)
+            self._thread.start()
+
+    def due(self):
+        """True if the next capture() call will store a frame (lets callers skip rendering otherwise)."""
+        return self._calls % self.stride == 0
+
+    def skip(self):
+        """Count a frame that was not rendered because due() was False."""
+        self._calls += 1
+
+    def capture(self, surface):
+        index = self._calls
+        self._calls += 1
+        if index % self.stride:
+            return False
+        if self.sink is not None and self._head - self._tail >= self.capacity:
+            self.dropped += 1
+            return False
+        slot = self._head % self.capacity
+        pixels = pygame.surfarray.pixels3d(surface)
+        try:
+            np.copyto(self.frames[slot], pixels.transpose(1, 0, 2))
+        finally:
+            # Unlocks the surface
+            del pixels
+        self.indices[slot] = index
+        with self._wake:
+            self._head += 1
+            self._wake.notify()
+        return True
+
+    def latest(self):
+        """Newest captured frame as a (height, width, 3) view into the buffer, or None."""
+        if not self._head:
+            return None
+        return self.frames[(self._head - 1) % self.capacity]
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while self._tail == self._head and not self._stop:
+                    self._wake.wait()
+                if self._tail == self._head and self._stop:
+                    return
+                head = self._head
+            while self._tail < head:
+                slot = self._tail % self.capacity
+                self.sink(self.frames[slot], self.indices[slot])
+                self._tail += 1
+                self.written += 1
+
+    def close(self):
+        if self._thread is not None:
+            with self._wake:
+                self._stop = True
+                self._wake.notify()
+            self._thread.join()
+            self._thread = None
+        if self.sink is not None and hasattr(self.sink, "close"):
+            self.sink.close()
+
+
+# --- Sinks ---
+
+class NpySink:
+    """Streams frames into one (frames, height, width, 3) uint8 .npy file."""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.shape = (height, width, 3)
+        self.count = 0
+        self._file = open(path + ".raw", "wb")
+
+    def __call__(self, frame, index):
+        self._file.write(frame.tobytes())
+        self.count += 1
+
+    def close(self):
+        # The frame count is only known at the end, so the header is written last
+        self._file.close()
+        shape = (self.count,) + self.shape
+        out = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.uint8, shape=shape)
+        if self.count:
+            raw = np.memmap(self.path + ".raw", dtype=np.uint8, mode="r", shape=shape)
+            for start in range(0, self.count, 256):
+                out[start:start + 256] = raw[start:start + 256]
+            del raw
+        out.flush()
+        del out
+        os.remove(self.path + ".raw")
+
+
+class PngSink:
+    """One PNG per frame, named by frame index."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, frame, index):
+        surface = pygame.surfarray.make_surface(frame.transpose(1, 0, 2))
+        pygame.image.save(surface, os.path.join(self.directory, f"frame_{index:06d}.png"))
+
+
+class VideoSink:
+    """Pipes raw frames to an ffmpeg process (ffmpeg must be on PATH)."""
+
+    def __init__(self, path, width, height, fps=30):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("VideoSink needs ffmpeg on PATH; use NpySink or PngSink instead")
+        self._process = subprocess.Popen(
+            [ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+             "-r", str(fps), "-i", "-", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE)
+
+    def __call__(self, frame, index):
+        self._process.stdin.write(frame.tobytes())
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.wait()
+
+
+def record_battle(scenario, sink, width=400, height=300, stride=2, capacity=64, max_time=MAX_BATTLE_TIME, **battle_kwargs):
+    """Run one headless battle, rendering and capturing every stride-th tick; returns its BattleResult."""
+    init_headless()
+    battle = Battle(scenario, **battle_kwargs)
+    renderer = BattleRenderer(battle, width, height)
+    capture = FrameCapture(width, height, sink=sink, capacity=capacity, stride=stride)
+    try:
+        while battle.time < max_time:
+            battle.step()
+            # Only render the frames that will be kept
+            if capture.due():
+                capture.capture(renderer.render())
+            else:
+                capture.skip()
+            if battle.is_over():
+                break
+    finally:
+        capture.close()
+    return battle.result()
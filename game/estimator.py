@@ -0,0 +1,250 @@
+import math
+
+import numpy as np
+
+from game.scenarios import UNIT_REGISTRY
+
+# Units are instantiated at this tile size once per profile, so their pixel stats read as meters
+PROFILE_TILE = 10
+# Exponents tried by calibrate(): 1 is Lanchester's linear law, 2 the square law
+EXPONENTS = tuple(round(1.0 + 0.1 * i, 1) for i in range(11))
+
+
+class UnitProfile:
+    """Combat stats of one placement (a unit or a whole group), in meters and seconds."""
+
+    def __init__(self, unit_type, overrides=None):
+        unit = UNIT_REGISTRY[unit_type](grid_pos=(1, 1), team=0, tile_size=PROFILE_TILE, **(overrides or {}))
+        members = unit.get_units()
+        first = members[0]
+        self.unit_type = unit_type
+        self.count = len(members)
+        self.health = sum(member.max_health for member in members) / self.count
+        self.attack_power = first.attack_power
+        self.attack_interval = first.attack_interval
+        self.attack_range = first.attack_range
+        self.splash = first.attack_splash_range
+        self.speed = first.movement_speed
+        w, h = unit.GRID_SIZE if hasattr(unit, "GRID_SIZE") else first.size
+        # Members per square meter while the group is still packed in its footprint
+        self.density = self.count / (w * h * PROFILE_TILE * PROFILE_TILE)
+
+    @property
+    def total_health(self):
+        return self.health * self.count
+
+
+class Estimate:
+    """Predicted outcome of one battle. winner is 0, 1 or None; confidence is P(winner is right)."""
+
+    def __init__(self, scenario_id, winner, health, confidence, margin):
+        self.scenario_id = scenario_id
+        self.winner = winner
+        self.health = health            # (team0, team1) predicted remaining health fraction
+        self.confidence = confidence
+        self.margin = margin            # log strength ratio, positive when team 0 is stronger
+
+    def to_dict(self):
+        return {
+            "scenario_id": self.scenario_id,
+            "winner": self.winner,
+            "health": list(self.health),
+            "confidence": self.confidence,
+            "margin": self.margin,
+        }
+
+    def __repr__(self):
+        return (f"Estimate({self.scenario_id!r}, winner={self.winner}, confidence={self.confidence:.2f}, "
+                f"health=({self.health[0]:.2f}, {self.health[1]:.2f}))")
+
+
+class OutcomeEstimator:
+    """Lanchester-style outcome estimate from a scenario's placements alone.
+
+    Each side is reduced to its total health H and its damage per second D
+    against the other side's mix, where a shot's damage is capped by the
+    target's health (a Marksman overkills a Crawler) and splash is worth the
+    number of packed group members it covers. Ranged units get free fire
+    while slower-ranged enemies close the range gap. The fight then follows
+    the generalized Lanchester law dH0/dt = -D1 (H1/H1_0)^(e-1), whose
+    invariant a*H0^e - b*H1^e (a = D/H per side) gives the winner and the
+    survivor's remaining health in closed form. The confidence is a logistic
+    function of the log strength ratio; calibrate() fits it and the exponent
+    e against full simulation results.
+
+    Profiles are cached per (unit type, overrides), and whole batches are
+    solved as numpy matrix products: estimate_batch() handles well over
+    100k scenarios per second, while estimate() is a batch of one and pays
+    the numpy overhead every call.
+    """
+
+    def __init__(self, exponent=2.0, slope=1.5, intercept=0.0):
+        self.exponent = exponent
+        self.slope = slope
+        self.intercept = intercept
+        self.profiles = []
+        self._index = {}
+        self._matrices = None
+
+    # --- Profiles ---
+
+    def profile_index(self, unit_type, overrides=None):
+        key = (unit_type, tuple(sorted(overrides.items()))) if overrides else unit_type
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.profiles)
+            self.profiles.append(UnitProfile(unit_type, overrides))
+            self._matrices = None
+        return index
+
+    def _pair_matrices(self):
+        """Per-profile health and (attacker, target) damage-per-second and free-fire matrices."""
+        if self._matrices is not None:
+            return self._matrices
+        profiles = self.profiles
+        size = len(profiles)
+        health = np.array([p.health for p in profiles])
+        members = np.array([p.count for p in profiles], dtype=np.float64)
+        dps = np.zeros((size, size))
+        free_time = np.zeros((size, size))
+        for i, attacker in enumerate(profiles):
+            if attacker.attack_power <= 0:
+                continue
+            for j, target in enumerate(profiles):
+                hits = 1.0
+                if attacker.splash > 0:
+                    hits = min(target.count, 1.0 + math.pi * attacker.splash ** 2 * target.density)
+                dps[i, j] = min(attacker.attack_power, target.health) * hits / attacker.attack_interval
+                if target.speed > 0 and target.attack_power > 0:
+                    free_time[i, j] = max(0.0, attacker.attack_range - target.attack_range) / target.speed
+        self._matrices = health * members, members, dps, dps * free_time
+        return self._matrices
+
+    def composition(self, scenarios):
+        """(N, profiles) placement counts per team for a batch of scenarios."""
+        rows = ([], [])
+        for scenario in scenarios:
+            counts = ({}, {})
+            for p in scenario.placements:
+                index = self.profile_index(p.unit_type, p.overrides)
+                side = counts[p.team]
+                side[index] = side.get(index, 0) + 1
+            rows[0].append(counts[0])
+            rows[1].append(counts[1])
+        size = len(self.profiles)
+        c0 = np.zeros((len(rows[0]), size))
+        c1 = np.zeros((len(rows[1]), size))
+        for matrix, side in ((c0, rows[0]), (c1, rows[1])):
+            for n, counts in enumerate(side):
+                for index, count in counts.items():
+                    matrix[n, index] = count
+        return c0, c1
+
+    # --- Solving ---
+
+    def solve(self, c0, c1, exponent=None):
+        """Vectorized estimate for placement count matrices.
+
+        Returns (winner, health, margin): winner is 0, 1 or -1 for a draw,
+        health is (N, 2) remaining fractions and margin the log strength
+        ratio (team 0 over team 1).
+        """
+        e = self.exponent if exponent is None else exponent
+        unit_health, members, dps, free = self._pair_matrices()
+        size = len(unit_health)
+        c0 = c0[:, :size]
+        c1 = c1[:, :size]
+        h0 = c0 @ unit_health
+        h1 = c1 @ unit_health
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Damage is spread over the enemy mix in proportion to its health
+            w0 = np.nan_to_num(c0 * unit_health / h0[:, None])
+            w1 = np.nan_to_num(c1 * unit_health / h1[:, None])
+            d0 = ((c0 * members) @ dps * w1).sum(axis=1)
+            d1 = ((c1 * members) @ dps * w0).sum(axis=1)
+            # Free fire before contact, then the Lanchester exchange on what is left
+            start0 = np.maximum(h0 - ((c1 * members) @ free * w0).sum(axis=1), 0.0)
+            start1 = np.maximum(h1 - ((c0 * members) @ free * w1).sum(axis=1), 0.0)
+            a = np.nan_to_num(d0 / h0)
+            b = np.nan_to_num(d1 / h1)
+            s0 = a * start0 ** e
+            s1 = b * start1 ** e
+            margin = np.log(s0) - np.log(s1)
+            left0 = np.nan_to_num(np.maximum(start0 ** e - np.where(a > 0, b / a, 0.0) * start1 ** e, 0.0) ** (1 / e))
+            left1 = np.nan_to_num(np.maximum(start1 ** e - np.where(b > 0, a / b, 0.0) * start0 ** e, 0.0) ** (1 / e))
+            health = np.stack([np.nan_to_num(np.where(s0 >= s1, left0, 0.0) / h0),
+                               np.nan_to_num(np.where(s1 >= s0, left1, 0.0) / h1)], axis=1)
+        # Neither side can hurt the other: nothing changes and the battle times out
+        stalled = (d0 <= 0) & (d1 <= 0)
+        health[stalled, 0] = np.nan_to_num(start0[stalled] / h0[stalled])
+        health[stalled, 1] = np.nan_to_num(start1[stalled] / h1[stalled])
+        margin = np.where(stalled, 0.0, np.nan_to_num(margin, nan=0.0, posinf=50.0, neginf=-50.0))
+        winner = np.where(margin > 0, 0, np.where(margin < 0, 1, -1))
+        # A side that starts empty has already lost
+        winner = np.where((h0 > 0) & (h1 <= 0), 0, np.where((h1 > 0) & (h0 <= 0), 1, winner))
+        return winner, health, margin
+
+    def confidence(self, margin):
+        return 1.0 / (1.0 + np.exp(-(self.slope * np.abs(margin) + self.intercept)))
+
+    def estimate_batch(self, scenarios):
+        scenarios = list(scenarios)
+        winner, health, margin = self.solve(*self.composition(scenarios))
+        confidence = self.confidence(margin)
+        return [Estimate(scenario.id, None if w < 0 else int(w), (float(h[0]), float(h[1])), float(c), float(m))
+                for scenario, w, h, c, m in zip(scenarios, winner, health, confidence, margin)]
+
+    def estimate(self, scenario):
+        return self.estimate_batch([scenario])[0]
+
+    # --- Calibration ---
+
+    def calibrate(self, scenarios, results, exponents=EXPONENTS):
+        """Fit the exponent and the confidence curve to full-simulation results.
+
+        results are BattleResults (or their dicts) in scenario order. The
+        exponent minimizes winner mistakes, then remaining-health error; the
+        confidence is a logistic regression of "winner was right" on the
+        absolute margin. Returns (accuracy, mean health error) after fitting.
+        """
+        c0, c1 = self.composition(scenarios)
+        actual = np.array([_winner_code(r) for r in results])
+        actual_health = np.array([_health(r) for r in results], dtype=np.float64)
+        best = None
+        for e in exponents:
+            winner, health, margin = self.solve(c0, c1, exponent=e)
+            error = np.abs(health - actual_health).mean()
+            key = ((winner != actual).sum(), error)
+            if best is None or key < best[0]:
+                best = (key, e, winner, margin)
+        (_, error), self.exponent, winner, margin = best
+        correct = (winner == actual).astype(np.float64)
+        self.slope, self.intercept = _fit_logistic(np.abs(margin), correct, self.slope, self.intercept)
+        return float(correct.mean()), float(error)
+
+
+def _winner_code(result):
+    winner = result["winner"] if isinstance(result, dict) else result.winner
+    return -1 if winner is None else winner
+
+
+def _health(result):
+    return result["health"] if isinstance(result, dict) else result.health
+
+
+def _fit_logistic(x, y, slope, intercept, iterations=25, ridge=1e-3):
+    """Newton's method for P(y) = sigmoid(slope * x + intercept), starting from the current fit."""
+    if y.min() == y.max():
+        # Every prediction right (or wrong): keep the slope, push the intercept toward the observed rate
+        return slope, (4.0 if y[0] else -4.0)
+    features = np.stack([x, np.ones_like(x)], axis=1)
+    params = np.array([slope, intercept], dtype=np.float64)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-features @ params))
+        gradient = features.T @ (p - y) + ridge * params
+        hessian = (features * (p * (1 - p))[:, None]).T @ features + ridge * np.eye(2)
+        update = np.linalg.solve(hessian, gradient)
+        params -= update
+        if np.abs(update).max() < 1e-8:
+            break
+    return float(params[0]), float(params[1])
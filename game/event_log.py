@@ -0,0 +1,151 @@
+import json
+import sys
+import threading
+
+# Event levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+
+def _describe(obj):
+    # Units are formatted lazily on the writer thread as "Type#id"
+    if obj is None or isinstance(obj, (int, float, str)):
+        return obj
+    if isinstance(obj, (tuple, list)):
+        return [_describe(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: _describe(value) for key, value in obj.items()}
+    if isinstance(obj, type):
+        return obj.__name__
+    return f"{type(obj).__name__}#{id(obj):x}"
+
+
+class EventLog:
+    """Levelled event log backed by a preallocated ring buffer.
+
+    emit() only stores references into fixed slots; formatting and I/O
+    happen on a background writer thread. Hot paths should guard calls with
+    `if EVENTS.active:` (or `EVENTS.debug` for DEBUG events) so that a
+    disabled log costs a single attribute read.
+    """
+
+    def __init__(self, capacity=8192, level=OFF, stream=None, flush_interval=0.1):
+        self.capacity = capacity
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.time = 0.0          # Simulation time stamped onto events
+        self.dropped = 0         # Events overwritten before the writer reached them
+
+        # Parallel slot lists, allocated once
+        self._times = [0.0] * capacity
+        self._levels = [0] * capacity
+        self._kinds = [None] * capacity
+        self._sources = [None] * capacity
+        self._targets = [None] * capacity
+        self._values = [None] * capacity
+        self._head = 0           # Total events written
+        self._tail = 0           # Total events consumed by the writer
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = level
+        self.active = level < OFF
+        self.debug = level <= DEBUG
+        if self.active and self.stream is not None:
+            self.start()
+
+    def emit(self, level, kind, source=None, target=None, value=None, time=None):
+        if level < self.level:
+            return
+        head = self._head
+        i = head % self.capacity
+        self._times[i] = self.time if time is None else time
+        self._levels[i] = level
+        self._kinds[i] = kind
+        self._sources[i] = source
+        self._targets[i] = target
+        self._values[i] = value
+        self._head = head + 1
+
+    def _take(self):
+        """Return pending events as dicts and advance the tail."""
+        head = self._head
+        tail = self._tail
+        if head - tail > self.capacity:
+            self.dropped += head - tail - self.capacity
+            tail = head - self.capacity
+        raw = []
+        for n in range(tail, head):
+            i = n % self.capacity
+            raw.append((self._times[i], self._levels[i], self._kinds[i],
+                        self._sources[i], self._targets[i], self._values[i]))
+        # emit() may have wrapped around while the slots were copied; a slot is only
+        # safe if no later emit (including one still writing at _head) shares it
+        overwritten = min(max(self._head - self.capacity + 1 - tail, 0), len(raw))
+        self.dropped += overwritten
+        events = []
+        for time, level, kind, source, target, value in raw[overwritten:]:
+            events.append({
+                "t": round(time, 4),
+                "level": LEVEL_NAMES.get(level, level),
+                "event": kind,
+                "source": _describe(source),
+                "target": _describe(target),
+                "value": _describe(value),
+            })
+        self._tail = head
+        return events
+
+    def recent(self, n=None):
+        """Events still held in the ring buffer, oldest first (does not consume)."""
+        head = self._head
+        count = min(head, self.capacity) if n is None else min(n, head, self.capacity)
+        events = []
+        for k in range(head - count, head):
+            i = k % self.capacity
+            events.append((self._times[i], self._levels[i], self._kinds[i],
+                           self._sources[i], self._targets[i], self._values[i]))
+        return events
+
+    def flush(self):
+        if self.stream is None:
+            self._tail = self._head
+            return
+        events = self._take()
+        if events:
+            self.stream.write("".join(json.dumps(e) + "\n" for e in events))
+            self.stream.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+
+
+# Shared log used by the game loop and units; disabled until configured
+EVENTS = EventLog(stream=sys.stdout)
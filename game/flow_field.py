@@ -0,0 +1,164 @@
+import math
+from collections import deque
+
+from game.board import Board
+
+INF = float("inf")
+
+# 8-connected neighbourhood; BFS distance on it is the Chebyshev distance in tiles
+NEIGHBOURS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+# (width, height) -> neighbour indices per cell, shared by every field on a board of that size
+_ADJACENCY = {}
+
+
+def adjacency(width, height):
+    """In-bounds neighbour indices per cell, so the BFS does no bounds checks."""
+    adjacent = _ADJACENCY.get((width, height))
+    if adjacent is None:
+        adjacent = []
+        for i in range(width * height):
+            row, col = divmod(i, width)
+            adjacent.append(tuple((row + dr) * width + col + dc for dc, dr in NEIGHBOURS
+                                  if 0 <= row + dr < height and 0 <= col + dc < width))
+        adjacent = _ADJACENCY[(width, height)] = tuple(adjacent)
+    return adjacent
+
+
+class FlowField:
+    """Distance-to-nearest-enemy field over the board grid for one team.
+
+    build() runs a multi-source BFS from every tile covered by an enemy and
+    stores, per tile, the distance in tiles; the unit heading toward the
+    closest enemy is derived on first use for each sampled tile. Melee
+    units sample their tile instead of searching all enemies, so swarm
+    movement costs O(tiles + units) per rebuild rather than
+    O(units * enemies); the BFS is skipped when the enemy tiles are the
+    same as at the last build. Allies are bucketed by tile at the same time so
+    local avoidance only looks at the surrounding 3x3 tiles.
+    """
+
+    def __init__(self, tile_size, refresh_interval=1, engage_distance=2):
+        self.tile_size = tile_size
+        self.width = Board.TOTAL_WIDTH
+        self.height = Board.TOTAL_HEIGHT
+        self.refresh_interval = refresh_interval  # Rebuild every N update() calls
+        self.engage_distance = engage_distance    # Tiles; closer units switch to direct targeting
+        cells = self.width * self.height
+        self.distance = [INF] * cells
+        self.heading = [None] * cells             # Filled lazily by heading_at()
+        self.buckets = [[] for _ in range(cells)]
+        self._adjacent = adjacency(self.width, self.height)
+        self._ticks = 0
+        self._seeds = None                        # Enemy tiles the current distances were built from
+        self.stale = True                         # Set while the field does not reflect the last tick
+
+    def cell_of(self, x, y):
+        col = int(x // self.tile_size)
+        row = int(y // self.tile_size)
+        col = 0 if col < 0 else (self.width - 1 if col >= self.width else col)
+        row = 0 if row < 0 else (self.height - 1 if row >= self.height else row)
+        return row * self.width + col
+
+    def unit_cell(self, unit):
+        half = self.tile_size * 0.5
+        return self.cell_of(unit.pixel_pos[0] + unit.size[0] * half,
+                            unit.pixel_pos[1] + unit.size[1] * half)
+
+    def invalidate(self):
+        """Mark the field out of date (its update was skipped); the next update() rebuilds it."""
+        self.stale = True
+
+    def update(self, enemies, allies=None):
+        """Rebuild the field if refresh_interval calls have passed since the last build, or it is stale."""
+        if self.stale or self._ticks % self.refresh_interval == 0:
+            self.build(enemies, allies)
+        elif allies is not None:
+            self._bucket(allies)
+        self._ticks += 1
+
+    def build(self, enemies, allies=None):
+        width, height = self.width, self.height
+        seeds = set()
+        for enemy in enemies:
+            if not enemy.alive:
+                continue
+            # Seed every tile under the enemy's footprint
+            row0, col0 = divmod(self.cell_of(enemy.pixel_pos[0], enemy.pixel_pos[1]), width)
+            sw, sh = enemy.size
+            for row in range(row0, min(row0 + sh, height)):
+                for col in range(col0, min(col0 + sw, width)):
+                    seeds.add(row * width + col)
+
+        if seeds != self._seeds:
+            # Distances only depend on the seed tiles, so an unchanged set keeps them (and the headings)
+            distance = [INF] * (width * height)
+            for i in seeds:
+                distance[i] = 0
+            queue = deque(seeds)
+            adjacent = self._adjacent
+            while queue:
+                i = queue.popleft()
+                d = distance[i] + 1
+                for j in adjacent[i]:
+                    if distance[j] > d:
+                        distance[j] = d
+                        queue.append(j)
+            self.distance = distance
+            self.heading = [None] * (width * height)
+            self._seeds = seeds
+        self.stale = False
+        if allies is not None:
+            self._bucket(allies)
+
+    def _bucket(self, allies):
+        for bucket in self.buckets:
+            bucket.clear()
+        for ally in allies:
+            if ally.alive:
+                self.buckets[self.unit_cell(ally)].append(ally)
+
+    def distance_at(self, unit):
+        return self.distance[self.unit_cell(unit)]
+
+    def heading_at(self, unit):
+        return self.heading_at_cell(self.unit_cell(unit))
+
+    def heading_at_cell(self, i):
+        heading = self.heading[i]
+        if heading is None:
+            heading = self.heading[i] = self._heading(i)
+        return heading
+
+    def _heading(self, i):
+        # Heading follows the central-difference gradient of the distance, which
+        # avoids the sideways drift that picking a single BFS neighbour gives on ties
+        distance = self.distance
+        width, height = self.width, self.height
+        d = distance[i]
+        if d == 0 or d == INF:
+            return (0.0, 0.0)
+        row, col = divmod(i, width)
+        left = distance[i - 1] if col > 0 else d
+        right = distance[i + 1] if col < width - 1 else d
+        up = distance[i - width] if row > 0 else d
+        down = distance[i + width] if row < height - 1 else d
+        gx = min(left, d + 1) - min(right, d + 1)
+        gy = min(up, d + 1) - min(down, d + 1)
+        if gx == 0 and gy == 0:
+            # Plateau: step toward any strictly closer neighbour
+            for j in self._adjacent[i]:
+                if distance[j] < d:
+                    r, c = divmod(j, width)
+                    gx, gy = c - col, r - row
+                    break
+        norm = math.hypot(gx, gy)
+        return (gx / norm, gy / norm) if norm else (0.0, 0.0)
+
+    def nearby_allies(self, unit):
+        """Allies bucketed in the 3x3 tiles around the unit at the last update."""
+        row, col = divmod(self.unit_cell(unit), self.width)
+        nearby = []
+        for r in range(max(row - 1, 0), min(row + 2, self.height)):
+            for c in range(max(col - 1, 0), min(col + 2, self.width)):
+                nearby.extend(self.buckets[r * self.width + c])
+        return nearby
@@ -0,0 +1,86 @@
+import heapq
+import itertools
+import math
+
+# Pixels a target may drift from the aim point before a flight is re-estimated
+RETARGET_DISTANCE = 4.0
+
+
+class ImpactQueue:
+    """In-flight projectiles held as scheduled impacts instead of being stepped every tick.
+
+    A drop-in for the projectile list that step() and Unit.attack() share.
+    append() aims a new projectile at its target's current center and
+    pushes its impact time (flight distance / speed) onto a heap; advance()
+    pops only the impacts that are due, so a headless battle pays per shot
+    rather than per shot per tick. If a due projectile's target has moved
+    more than retarget_distance pixels off the aim point, the flight is
+    re-estimated from there to the target's new center and scheduled again;
+    otherwise it lands on the target's current center, just as a stepped
+    projectile would.
+
+    Shots leave at the start of the tick that fires them (time), like a
+    stepped projectile whose first move covers that whole tick, so against
+    a still target both land on the same tick. pos is only interpolated
+    when the queue is iterated, i.e. by renderers and observation encoders.
+    """
+
+    def __init__(self, retarget_distance=RETARGET_DISTANCE):
+        self.retarget_distance = retarget_distance
+        self.time = 0.0          # Time of the last advance(), which is when new shots leave
+        self.retargets = 0       # Flights re-estimated because their target moved
+        self._heap = []          # (impact time, sequence, projectile)
+        self._sequence = itertools.count()
+
+    def append(self, projectile):
+        projectile.start = tuple(projectile.pos)
+        self._launch(projectile, self.time)
+
+    def _launch(self, projectile, time):
+        # One straight leg from projectile.start to where the target is now
+        sx, sy = projectile.start
+        ax, ay = projectile.aim = projectile.target_center()
+        projectile.fired_at = time
+        projectile.impact_time = time + math.hypot(ax - sx, ay - sy) / projectile.speed
+        heapq.heappush(self._heap, (projectile.impact_time, next(self._sequence), projectile))
+
+    def next_impact(self):
+        """Time of the earliest scheduled impact, or None with nothing in flight."""
+        return self._heap[0][0] if self._heap else None
+
+    def advance(self, now):
+        """Land every impact due by now, in time order; returns how many landed."""
+        heap = self._heap
+        landed = 0
+        while heap and heap[0][0] <= now + 1e-9:
+            impact_time, _, projectile = heapq.heappop(heap)
+            tx, ty = projectile.target_center()
+            ax, ay = projectile.aim
+            if math.hypot(tx - ax, ty - ay) > self.retarget_distance:
+                # The projectile reached the aim point at impact_time; fly on from there
+                projectile.start = projectile.aim
+                self._launch(projectile, impact_time)
+                self.retargets += 1
+                continue
+            projectile.hit(tx, ty)
+            landed += 1
+        self.time = now
+        return landed
+
+    def __iter__(self):
+        """In-flight projectiles, with pos interpolated along their current leg to self.time."""
+        time = self.time
+        for impact_time, _, projectile in self._heap:
+            sx, sy = projectile.start
+            ax, ay = projectile.aim
+            flight = impact_time - projectile.fired_at
+            t = min(max((time - projectile.fired_at) / flight, 0.0), 1.0) if flight > 0 else 1.0
+            projectile.pos[0] = sx + (ax - sx) * t
+            projectile.pos[1] = sy + (ay - sy) * t
+            yield projectile
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __repr__(self):
+        return f"ImpactQueue({len(self._heap)} in flight)"
@@ -0,0 +1,236 @@
+import numpy as np
+
+from game.board import Board
+from game.units import UNIT_TYPES
+
+
+class ObservationEncoder:
+    """Encodes the live battle into a fixed-shape (C, 20, 18) float32 tensor.
+
+    The tensor is updated incrementally and update() only visits units the
+    simulation reported as changed. On first sight the encoder hands each
+    unit its `changes` set and the pixel box its position may move within
+    before it leaves its tile; take_damage(), attack() and the movement
+    code add the unit to that set when its health, cooldown or tile
+    changes. Units still cooling down are revisited every update, as their
+    cooldown channel drains with time. A unit already watched by another
+    encoder is polled instead. New units are found by a full scan, which
+    only runs when the team sizes stop matching the cache.
+
+    A touched cell is recomputed from the cached values of the units on it
+    rather than patched with +/- deltas, so float32 rounding never
+    accumulates and empty cells are exactly 0. Units are rasterized at the
+    tile under their center.
+    """
+
+    UNIT_TYPES = UNIT_TYPES
+
+    # Channel layout
+    CH_PRESENCE = 0                              # 0, 1: unit count per team
+    CH_HP = 2                                    # 2, 3: summed health fraction per team
+    CH_COOLDOWN = 4                              # 4, 5: summed remaining cooldown fraction per team
+    CH_TYPE = 6                                  # 6..13: unit count per (team, unit type)
+    CH_PROJECTILE = CH_TYPE + 2 * len(UNIT_TYPES)  # 14: in-flight projectiles
+    NUM_CHANNELS = CH_PROJECTILE + 1
+
+    SHAPE = (NUM_CHANNELS, Board.TOTAL_HEIGHT, Board.TOTAL_WIDTH)
+
+    def __init__(self, tile_size, x_offset=0, y_offset=0, out=None):
+        self.tile_size = tile_size
+        # Offsets only matter for projectiles, which live in screen pixels
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        if out is None:
+            out = np.zeros(self.SHAPE, dtype=np.float32)
+        elif out.shape != self.SHAPE:
+            raise ValueError(f"out must have shape {self.SHAPE}, got {out.shape}")
+        # Writing into a caller-owned slice lets many environments share one batch array
+        self.obs = out
+        self._type_channels = {name: i for i, name in enumerate(self.UNIT_TYPES)}
+        # id(unit) -> [unit, team, row, col, hp, cooldown, type_index]
+        self._entries = {}
+        self._occupants = {}      # (row, col) -> {id(unit)} of the units cached on that cell
+        self._dirty = set()       # Cells to rewrite at the end of update()
+        self._changed = set()     # Units the simulation reported since the last update
+        self._cooling = set()     # Units whose cooldown was still draining at the last update
+        self._polled = set()      # Units another encoder watches, refreshed every update
+        self._projectile_cells = []
+
+    def reset(self):
+        self.release()
+        self.obs.fill(0.0)
+        self._entries.clear()
+        self._occupants.clear()
+        self._dirty.clear()
+        self._cooling.clear()
+        self._polled.clear()
+        self._projectile_cells = []
+
+    def release(self):
+        """Stop the units this encoder watches from reporting to it."""
+        for unit, *_ in self._entries.values():
+            if unit.changes is self._changed:
+                unit.changes = None
+                unit.cell_box = None
+        self._changed.clear()
+
+    def _cell(self, x, y):
+        col = int(x // self.tile_size)
+        row = int(y // self.tile_size)
+        if col < 0:
+            col = 0
+        elif col >= Board.TOTAL_WIDTH:
+            col = Board.TOTAL_WIDTH - 1
+        if row < 0:
+            row = 0
+        elif row >= Board.TOTAL_HEIGHT:
+            row = Board.TOTAL_HEIGHT - 1
+        return row, col
+
+    def _unit_cell(self, unit):
+        half = self.tile_size * 0.5
+        return self._cell(unit.pixel_pos[0] + unit.size[0] * half,
+                          unit.pixel_pos[1] + unit.size[1] * half)
+
+    def _place(self, key, row, col):
+        self._occupants.setdefault((row, col), set()).add(key)
+        self._dirty.add((row, col))
+
+    def _lift(self, key, row, col):
+        occupants = self._occupants[(row, col)]
+        occupants.discard(key)
+        if not occupants:
+            del self._occupants[(row, col)]
+        self._dirty.add((row, col))
+
+    def _rewrite(self, row, col):
+        """Recompute a cell's unit channels from the cached values of the units on it."""
+        column = [0.0] * self.CH_PROJECTILE
+        for key in self._occupants.get((row, col), ()):
+            _, team, _, _, hp, cooldown, type_index = self._entries[key]
+            column[self.CH_PRESENCE + team] += 1.0
+            column[self.CH_HP + team] += hp
+            column[self.CH_COOLDOWN + team] += cooldown
+            if type_index is not None:
+                column[self.CH_TYPE + team * len(self.UNIT_TYPES) + type_index] += 1.0
+        self.obs[:self.CH_PROJECTILE, row, col] = column
+
+    def _cell_box(self, unit, row, col):
+        """Range of unit.pixel_pos, as (x0, y0, x1, y1), that keeps its center on (row, col)."""
+        tile = self.tile_size
+        half = tile * 0.5
+        x0 = col * tile - unit.size[0] * half if col > 0 else float("-inf")
+        x1 = (col + 1) * tile - unit.size[0] * half if col < Board.TOTAL_WIDTH - 1 else float("inf")
+        y0 = row * tile - unit.size[1] * half if row > 0 else float("-inf")
+        y1 = (row + 1) * tile - unit.size[1] * half if row < Board.TOTAL_HEIGHT - 1 else float("inf")
+        return x0, y0, x1, y1
+
+    def _cooldown(self, unit, current_time):
+        remaining = unit.attack_interval - (current_time - unit.last_attack_time)
+        return remaining / unit.attack_interval if remaining > 0 and unit.attack_interval > 0 else 0.0
+
+    def _add_unit(self, unit, team, current_time):
+        key = id(unit)
+        row, col = self._unit_cell(unit)
+        hp = unit.health / (unit.max_health or 1)
+        cooldown = self._cooldown(unit, current_time)
+        type_index = self._type_channels.get(type(unit).__name__)
+        self._entries[key] = [unit, team, row, col, hp, cooldown, type_index]
+        self._place(key, row, col)
+        if cooldown > 0:
+            self._cooling.add(unit)
+        if unit.changes is None:
+            unit.changes = self._changed
+            unit.cell_box = self._cell_box(unit, row, col)
+        elif unit.changes is not self._changed:
+            self._polled.add(unit)
+
+    def _refresh(self, unit, current_time):
+        key = id(unit)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if not unit.alive:
+            self._drop(key)
+            return
+        hp = unit.health / (unit.max_health or 1)
+        cooldown = self._cooldown(unit, current_time)
+        if cooldown > 0:
+            self._cooling.add(unit)
+        else:
+            self._cooling.discard(unit)
+        row, col = self._unit_cell(unit)
+        if row == entry[2] and col == entry[3] and hp == entry[4] and cooldown == entry[5]:
+            return
+        # Something changed: mark the old and new cells for a rewrite
+        if row != entry[2] or col != entry[3]:
+            self._lift(key, entry[2], entry[3])
+            self._place(key, row, col)
+            if unit.changes is self._changed:
+                unit.cell_box = self._cell_box(unit, row, col)
+        else:
+            self._dirty.add((row, col))
+        entry[2], entry[3], entry[4], entry[5] = row, col, hp, cooldown
+
+    def update(self, team0, team1, projectiles=(), current_time=0.0):
+        """Bring the tensor up to date with the given teams and projectiles."""
+        changed = self._changed
+        visit = changed | self._polled if self._polled else set(changed)
+        changed.clear()
+        for unit in visit:
+            self._refresh(unit, current_time)
+        # Otherwise unchanged units only need their draining cooldown
+        entries = self._entries
+        for unit in [unit for unit in self._cooling if unit not in visit]:
+            entry = entries[id(unit)]
+            cooldown = self._cooldown(unit, current_time)
+            if cooldown <= 0:
+                self._cooling.discard(unit)
+            entry[5] = cooldown
+            self._dirty.add((entry[2], entry[3]))
+
+        # Team sizes that disagree with the cache mean units were added (or left without dying)
+        if len(team0) + len(team1) != len(self._entries):
+            self._rescan(team0, team1, current_time)
+        for row, col in self._dirty:
+            self._rewrite(row, col)
+        self._dirty.clear()
+
+        # Projectiles are few and always moving, so they are redrawn each update
+        obs = self.obs
+        for row, col in self._projectile_cells:
+            obs[self.CH_PROJECTILE, row, col] = 0.0
+        cells = []
+        for projectile in projectiles:
+            if projectile.active:
+                row, col = self._cell(projectile.pos[0] - self.x_offset, projectile.pos[1] - self.y_offset)
+                obs[self.CH_PROJECTILE, row, col] += 1.0
+                cells.append((row, col))
+        self._projectile_cells = cells
+        return obs
+
+    def _rescan(self, team0, team1, current_time):
+        present = set()
+        for team, units in ((0, team0), (1, team1)):
+            for unit in units:
+                if unit.alive:
+                    present.add(id(unit))
+                    if id(unit) not in self._entries:
+                        self._add_unit(unit, team, current_time)
+        for key in [k for k in self._entries if k not in present]:
+            self._drop(key)
+
+    def _drop(self, key):
+        # The unit leaves the tensor and stops reporting to this encoder
+        unit, _, row, col = self._entries.pop(key)[:4]
+        self._lift(key, row, col)
+        self._cooling.discard(unit)
+        self._polled.discard(unit)
+        if unit.changes is self._changed:
+            unit.changes = None
+            unit.cell_box = None
+
+    def encode(self, team0, team1, projectiles=(), current_time=0.0, copy=False):
+        """Update and return the observation, optionally as an independent copy."""
+        obs = self.update(team0, team1, projectiles, current_time)
+        return obs.copy() if copy else obs
@@ -0,0 +1,239 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from game.board import Board
+from game.scenarios import Scenario, Placement, footprint
+from game.simulation import Battle, MAX_BATTLE_TIME
+
+PLACEABLE_TYPES = ("Marksman", "Arclight", "CrawlerGroup")
+
+
+def score_result(result):
+    """Higher is better for team 0: a win is worth 1 plus the health margin."""
+    margin = result.health[0] - result.health[1]
+    if result.winner == 0:
+        return 1.0 + margin
+    if result.winner == 1:
+        return -1.0 + margin
+    return margin
+
+
+def score_outcome(result):
+    """score_result, except a pruned battle counts as lost by its current margin."""
+    if result.stopped_early:
+        return -1.0 + result.health[0] - result.health[1]
+    return score_result(result)
+
+
+def prune_when(prune_after, prune_margin=0.5):
+    """stop_when for Battle.run: true once prune_after seconds have passed and team 1 leads on health by more than prune_margin."""
+    def check(battle):
+        if battle.time < prune_after:
+            return False
+        ours, theirs = battle.health()
+        return theirs - ours > prune_margin
+    return check
+
+
+def evaluate(scenario_data, max_time=MAX_BATTLE_TIME, prune_after=5.0, prune_margin=0.5):
+    """Run one candidate battle and return its score.
+
+    Once prune_after seconds have passed, the battle is abandoned as soon as
+    the opponent leads on remaining health by more than prune_margin.
+    Takes and returns plain data so it can run in worker processes.
+    """
+    battle = Battle(Scenario.from_dict(scenario_data))
+    result = battle.run(max_time=max_time, stop_when=prune_when(prune_after, prune_margin))
+    return score_outcome(result), result.to_dict()
+
+
+def _init_worker():
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+class PlacementOptimizer:
+    """Evolutionary search for team 0 placements against a fixed opponent.
+
+    A candidate is a tuple of (unit_type, x, y) on the bottom half of the
+    board. Each generation keeps the elite, then fills the population with
+    mutated crossovers of tournament-selected parents. Candidates are
+    evaluated in parallel worker processes; scores are cached by layout, and
+    every random choice comes from one seeded RNG, so a run is reproducible
+    from its seed regardless of the number of workers.
+    """
+
+    def __init__(self, opponent, base=None, roster_size=3, unit_types=PLACEABLE_TYPES, population=32,
+                 elite=4, mutation_rate=0.3, seed=0, workers=None, max_time=MAX_BATTLE_TIME,
+                 prune_after=5.0, prune_margin=0.5, prescreen=None, prescreen_confidence=0.95, store=None,
+                 service=None):
+        self.opponent = opponent              # Scenario with the team 1 layout
+        self.base = base                      # Optional fixed team 0 units (e.g. a Building)
+        self.roster_size = roster_size
+        self.unit_types = tuple(unit_types)
+        self.population_size = population
+        self.elite = elite
+        self.mutation_rate = mutation_rate
+        self.rng = random.Random(seed)
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.eval_kwargs = {"max_time": max_time, "prune_after": prune_after, "prune_margin": prune_margin}
+        # Optional OutcomeEstimator: confidently lost candidates are scored from the estimate, not simulated
+        self.prescreen = prescreen
+        self.prescreen_confidence = prescreen_confidence
+        self.prescreened = 0
+        self.store = store                    # Optional ResultsStore that receives every simulated result
+        self.service = service                # Optional ServiceClient; battles then run on the shared pool
+        self.scores = {}                      # candidate -> score
+        self.results = {}                     # candidate -> BattleResult dict
+        self.best = None
+        self.best_score = float("-inf")
+        self._occupied_base = self._occupied(
+            [(p.unit_type, p.grid_pos[0], p.grid_pos[1]) for p in base.placements] if base is not None else [])
+
+    # --- Candidate generation ---
+
+    def _bounds(self, unit_type):
+        w, h = footprint(unit_type)
+        # Bottom half only: rows HEIGHT + 1 .. TOTAL_HEIGHT (grid positions are 1-based)
+        return (1, Board.TOTAL_WIDTH - w + 1), (Board.HEIGHT + 1, Board.TOTAL_HEIGHT - h + 1)
+
+    @staticmethod
+    def _occupied(units):
+        tiles = set()
+        for unit_type, x, y in units:
+            w, h = footprint(unit_type)
+            tiles.update((x + dx, y + dy) for dx in range(w) for dy in range(h))
+        return tiles
+
+    def _fits(self, unit_type, x, y, occupied):
+        w, h = footprint(unit_type)
+        return all((x + dx, y + dy) not in occupied for dx in range(w) for dy in range(h))
+
+    def _random_unit(self, unit_type, occupied, tries=50):
+        (x0, x1), (y0, y1) = self._bounds(unit_type)
+        for _ in range(tries):
+            x = self.rng.randint(x0, x1)
+            y = self.rng.randint(y0, y1)
+            if self._fits(unit_type, x, y, occupied):
+                return (unit_type, x, y)
+        return None
+
+    def _legalize(self, units):
+        """Drop overlaps by re-rolling positions; returns a canonical (sorted) candidate."""
+        occupied = set(self._occupied_base)
+        placed = []
+        for unit_type, x, y in units:
+            (x0, x1), (y0, y1) = self._bounds(unit_type)
+            x = min(max(x, x0), x1)
+            y = min(max(y, y0), y1)
+            unit = (unit_type, x, y) if self._fits(unit_type, x, y, occupied) else self._random_unit(unit_type, occupied)
+            if unit is not None:
+                placed.append(unit)
+                occupied |= self._occupied([unit])
+        return tuple(sorted(placed))
+
+    def random_candidate(self):
+        return self._legalize([(self.rng.choice(self.unit_types), 0, 0) for _ in range(self.roster_size)])
+
+    def mutate(self, candidate):
+        units = list(candidate)
+        for i, (unit_type, x, y) in enumerate(units):
+            if self.rng.random() >= self.mutation_rate:
+                continue
+            roll = self.rng.random()
+            if roll < 0.6:
+                # Small positional jitter
+                units[i] = (unit_type, x + self.rng.randint(-2, 2), y + self.rng.randint(-2, 2))
+            elif roll < 0.8:
+                units[i] = (self.rng.choice(self.unit_types), x, y)
+            else:
+                # Jump anywhere on our half; _legalize resolves any overlap
+                unit = self._random_unit(unit_type, self._occupied_base)
+                if unit is not None:
+                    units[i] = unit
+        return self._legalize(units)
+
+    def crossover(self, a, b):
+        return self._legalize([self.rng.choice(pair) for pair in zip(a, b)])
+
+    def _select(self, ranked):
+        # Tournament of three over the ranked (best-first) population
+        picks = [self.rng.randrange(len(ranked)) for _ in range(3)]
+        return ranked[min(picks)]
+
+    # --- Evaluation ---
+
+    def scenario_for(self, candidate, scenario_id=None):
+        placements = [Placement(unit_type, (x, y), 0, {}) for unit_type, x, y in candidate]
+        if self.base is not None:
+            placements = list(self.base.placements) + placements
+        opponent = [Placement(p.unit_type, p.grid_pos, 1, p.overrides) for p in self.opponent.placements]
+        return Scenario(placements + opponent, scenario_id=scenario_id)
+
+    def evaluate_all(self, candidates, executor=None):
+        pending = [c for c in dict.fromkeys(candidates) if c not in self.scores]
+        if self.prescreen is not None and pending:
+            pending = self._prescreen(pending)
+        scenarios = [self.scenario_for(c, scenario_id=str(c)) for c in pending]
+        payloads = [scenario.to_dict() for scenario in scenarios]
+        if self.service is not None:
+            results = self.service.map(payloads, **self.eval_kwargs) if payloads else []
+            outcomes = [(score_outcome(result), result.to_dict()) for result in results]
+        elif executor is not None:
+            outcomes = executor.map(_evaluate_payload, [(p, self.eval_kwargs) for p in payloads], chunksize=4)
+        else:
+            outcomes = map(_evaluate_payload, [(p, self.eval_kwargs) for p in payloads])
+        for candidate, scenario, (score, result) in zip(pending, scenarios, outcomes):
+            self.scores[candidate] = score
+            self.results[candidate] = result
+            if self.store is not None:
+                self.store.append(result, scenario)
+            if score > self.best_score:
+                self.best, self.best_score = candidate, score
+        return [self.scores[c] for c in candidates]
+
+    def _prescreen(self, pending):
+        """Score confident losses from the estimate and return the candidates that still need a battle.
+
+        Only losses are skipped, so the best candidate is always backed by a
+        full simulation.
+        """
+        estimates = self.prescreen.estimate_batch(self.scenario_for(c, scenario_id=str(c)) for c in pending)
+        remaining = []
+        for candidate, estimate in zip(pending, estimates):
+            if estimate.winner == 1 and estimate.confidence >= self.prescreen_confidence:
+                self.scores[candidate] = score_result(estimate)
+                self.results[candidate] = estimate.to_dict()
+                self.prescreened += 1
+            else:
+                remaining.append(candidate)
+        return remaining
+
+    def run(self, generations=10, callback=None):
+        """Evolve for the given number of generations; returns (best_candidate, best_score)."""
+        population = [self.random_candidate() for _ in range(self.population_size)]
+        executor = None
+        if self.workers and self.workers > 1 and self.service is None:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        try:
+            for generation in range(generations):
+                self.evaluate_all(population, executor)
+                ranked = sorted(population, key=lambda c: self.scores[c], reverse=True)
+                if callback is not None:
+                    callback(generation, ranked[0], self.scores[ranked[0]])
+                next_population = ranked[:self.elite]
+                while len(next_population) < self.population_size:
+                    child = self.crossover(self._select(ranked), self._select(ranked))
+                    next_population.append(self.mutate(child))
+                population = next_population
+            self.evaluate_all(population, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.best, self.best_score
+
+
+def _evaluate_payload(args):
+    scenario_data, kwargs = args
+    return evaluate(scenario_data, **kwargs)
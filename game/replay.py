@@ -0,0 +1,229 @@
+import hashlib
+
+import numpy as np
+
+from game.simulation import Battle, MAX_BATTLE_TIME, SIM_DT
+
+# Per-unit state columns recorded every tick
+STATE_FIELDS = ("health", "x", "y")
+# Exact mode compares digests of states rounded to this many decimals
+DIGEST_DECIMALS = 6
+# Simulated times closer than this are the same checkpoint
+TIME_EPSILON = 1e-6
+
+
+def reference_engine(scenario):
+    """The reference path: fixed dt, every unit stepped through Unit.act and Projectile.update."""
+    return Battle(scenario, flow_field_refresh=0)
+
+
+def unit_label(unit, index):
+    return f"#{index} {type(unit).__name__} (team {unit.team})"
+
+
+def snapshot(battle):
+    """(units, 3) array of health and board-pixel position in scenario build order.
+
+    Engines that do not keep Unit objects can provide their own
+    snapshot() method returning the same layout.
+    """
+    custom = getattr(battle, "snapshot", None)
+    if custom is not None:
+        return np.asarray(custom(), dtype=np.float64)
+    units = battle.roster0 + battle.roster1
+    state = np.empty((len(units), len(STATE_FIELDS)), dtype=np.float64)
+    for i, unit in enumerate(units):
+        state[i, 0] = max(unit.health, 0)
+        state[i, 1] = unit.pixel_pos[0]
+        state[i, 2] = unit.pixel_pos[1]
+    return state
+
+
+def digest(state):
+    return hashlib.blake2b(np.round(state, DIGEST_DECIMALS).tobytes(), digest_size=16).digest()
+
+
+def _labels(battle):
+    custom = getattr(battle, "labels", None)
+    if custom is not None:
+        return list(custom())
+    return [unit_label(unit, i) for i, unit in enumerate(battle.roster0 + battle.roster1)]
+
+
+def _run(scenario, engine, max_time):
+    battle = engine(scenario)
+    while battle.time < max_time and not battle.is_over():
+        battle.step()
+        yield battle
+
+
+def _advance(battle, time):
+    """Bring battle to simulated time; False if it ended first or can only step past it."""
+    advance_to = getattr(battle, "advance_to", None)
+    if advance_to is not None:
+        advance_to(time)
+    else:
+        while battle.time < time - TIME_EPSILON and not battle.is_over():
+            battle.step()
+    return abs(battle.time - time) <= TIME_EPSILON
+
+
+class GoldenRecord:
+    """Per-tick digests (and optionally full states) of one reference battle, with the simulated time of each tick."""
+
+    def __init__(self, scenario_id, digests, labels, states=None, times=None):
+        self.scenario_id = scenario_id
+        self.digests = digests          # list of 16-byte digests, one per tick
+        self.labels = labels            # unit descriptions in state order
+        self.states = states            # (ticks, units, 3) array, needed for tolerance mode
+        if times is None:
+            # Records saved without times came from the fixed-step reference engine
+            times = np.cumsum(np.full(len(digests), SIM_DT))
+        self.times = np.asarray(times, dtype=np.float64)
+
+    @property
+    def ticks(self):
+        return len(self.digests)
+
+
+class Divergence:
+    def __init__(self, scenario_id, tick, unit_index=None, unit=None, expected=None, actual=None, reason="", time=None):
+        self.scenario_id = scenario_id
+        self.tick = tick                # Golden tick the replay was checked against
+        self.time = time                # Its simulated time
+        self.unit_index = unit_index
+        self.unit = unit
+        self.expected = expected
+        self.actual = actual
+        self.reason = reason
+
+    def __repr__(self):
+        where = f"tick {self.tick}" if self.time is None else f"tick {self.tick} (t={self.time:.4f}s)"
+        if self.unit is not None:
+            where += f", unit {self.unit}"
+        detail = ""
+        if self.expected is not None:
+            fields = ", ".join(f"{name} {e:.6g} != {a:.6g}" for name, e, a in zip(STATE_FIELDS, self.expected, self.actual) if e != a)
+            detail = f": {fields}"
+        reason = f" ({self.reason})" if self.reason else ""
+        return f"Divergence({self.scenario_id!r} at {where}{detail}{reason})"
+
+
+def record(scenario, engine=reference_engine, keep_states=True, max_time=MAX_BATTLE_TIME):
+    digests = []
+    states = []
+    times = []
+    labels = None
+    for battle in _run(scenario, engine, max_time):
+        state = snapshot(battle)
+        if labels is None:
+            labels = _labels(battle)
+        digests.append(digest(state))
+        times.append(battle.time)
+        if keep_states:
+            states.append(state)
+    return GoldenRecord(scenario.id, digests, labels or [], np.stack(states) if states else None, times)
+
+
+def _first_unit_divergence(expected, actual, atol):
+    diff = np.abs(expected - actual) > atol
+    rows = np.flatnonzero(diff.any(axis=1))
+    return int(rows[0]) if rows.size else None
+
+
+def compare(golden, scenario, engine, tolerance=None, max_time=MAX_BATTLE_TIME, stride=1):
+    """Replay scenario on engine and return the first Divergence from golden, or None.
+
+    States are compared at the simulated times of the golden ticks, not by
+    tick index, so engines with other step sizes (adaptive, event-driven)
+    line up: the engine is advanced to each checked time with its
+    advance_to(time) if it has one, otherwise by stepping until it lands
+    on that time. stride checks every stride-th golden tick (and the last),
+    leaving an adaptive engine room for long steps in between.
+
+    tolerance=None requires identical digests. A number (or
+    (health_atol, position_atol) pair) compares raw states instead, which
+    allows floating-point drift but needs a record made with keep_states.
+    """
+    if tolerance is not None:
+        if golden.states is None:
+            raise ValueError("tolerance mode needs a golden record made with keep_states=True")
+        if isinstance(tolerance, (tuple, list)):
+            health_atol, position_atol = tolerance
+        else:
+            health_atol = position_atol = tolerance
+        atol = np.array([health_atol, position_atol, position_atol], dtype=np.float64)
+    else:
+        atol = np.zeros(len(STATE_FIELDS))
+    battle = engine(scenario)
+    checkpoints = list(range(stride - 1, golden.ticks, stride))
+    if golden.ticks and (not checkpoints or checkpoints[-1] != golden.ticks - 1):
+        checkpoints.append(golden.ticks - 1)
+    for tick in checkpoints:
+        time = golden.times[tick]
+        if not _advance(battle, time):
+            reason = ("battle ended before the golden record" if battle.is_over()
+                      else f"engine stepped to t={battle.time:.4f}s without stopping at the checked time")
+            return Divergence(golden.scenario_id, tick, reason=reason, time=time)
+        state = snapshot(battle)
+        if tolerance is None:
+            if digest(state) == golden.digests[tick]:
+                continue
+            if golden.states is None:
+                return Divergence(golden.scenario_id, tick, reason="digest mismatch", time=time)
+        expected = golden.states[tick]
+        if expected.shape != state.shape:
+            return Divergence(golden.scenario_id, tick, reason=f"unit count {state.shape[0]} != {expected.shape[0]}",
+                              time=time)
+        index = _first_unit_divergence(expected, state, atol)
+        if index is not None:
+            label = golden.labels[index] if index < len(golden.labels) else None
+            return Divergence(golden.scenario_id, tick, index, label, tuple(expected[index]), tuple(state[index]),
+                              time=time)
+    # The reference stopped early only because the battle was over
+    end = golden.times[-1] if golden.ticks else 0.0
+    if end < max_time - TIME_EPSILON and not battle.is_over():
+        return Divergence(golden.scenario_id, golden.ticks, reason="battle runs longer than the golden record", time=end)
+    return None
+
+
+# --- Corpus handling ---
+
+def record_corpus(scenarios, engine=reference_engine, keep_states=True, max_time=MAX_BATTLE_TIME):
+    return {scenario.id: record(scenario, engine, keep_states, max_time) for scenario in scenarios}
+
+
+def compare_corpus(golden, scenarios, engine, tolerance=None, max_time=MAX_BATTLE_TIME, stride=1):
+    """Map of scenario id -> Divergence for every scenario that does not match (empty when all match)."""
+    failures = {}
+    for scenario in scenarios:
+        result = compare(golden[scenario.id], scenario, engine, tolerance, max_time, stride)
+        if result is not None:
+            failures[scenario.id] = result
+    return failures
+
+
+def save_corpus(golden, path):
+    arrays = {}
+    for i, (scenario_id, rec) in enumerate(golden.items()):
+        arrays[f"{i}_id"] = np.array(str(scenario_id))
+        arrays[f"{i}_digests"] = np.frombuffer(b"".join(rec.digests), dtype=np.uint8).reshape(-1, 16)
+        arrays[f"{i}_labels"] = np.array(rec.labels, dtype=str)
+        arrays[f"{i}_times"] = rec.times
+        if rec.states is not None:
+            arrays[f"{i}_states"] = rec.states
+    np.savez_compressed(path, **arrays)
+
+
+def load_corpus(path):
+    golden = {}
+    with np.load(path) as data:
+        count = sum(1 for key in data.files if key.endswith("_id"))
+        for i in range(count):
+            scenario_id = str(data[f"{i}_id"])
+            digests = [row.tobytes() for row in data[f"{i}_digests"]]
+            labels = [str(label) for label in data[f"{i}_labels"]]
+            states = data[f"{i}_states"] if f"{i}_states" in data.files else None
+            times = data[f"{i}_times"] if f"{i}_times" in data.files else None
+            golden[scenario_id] = GoldenRecord(scenario_id, digests, labels, states, times)
+    return golden
@@ -0,0 +1,441 @@
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from game.scenarios import footprint
+from game.simulation import BattleResult
+from game.units import UNIT_TYPES
+
+META_FILE = "meta.json"
+ID_FILE = "scenario_id.bin"  # Per chunk: the rows' scenario ids as concatenated UTF-8
+WRITE_BATCH = 1024       # Rows the writer thread converts in one block before copying into the maps
+
+
+def _columns(unit_types):
+    """name -> (dtype, per-row shape). Per-type columns are indexed [team, unit type]."""
+    types = len(unit_types)
+    return {
+        "scenario_key": ("u8", ()),      # scenario_key() of the scenario id, for filtering
+        "scenario_id_end": ("i8", ()),   # End offset of the row's id in the chunk's scenario_id.bin
+        "winner": ("i1", ()),            # 0, 1 or -1 for a draw / timeout
+        "ticks": ("i4", ()),
+        "duration": ("f4", ()),
+        "stopped_early": ("?", ()),
+        "survivors": ("i2", (2,)),
+        "health": ("f4", (2,)),
+        "count": ("i2", (2, types)),     # Units placed per team and type (group members individually)
+        "alive": ("i2", (2, types)),     # Survivors per team and type
+        "damage": ("f4", (2, types)),    # Damage dealt per team and type
+        "centroid": ("f4", (2, 2)),      # Mean placement center (tile x, tile y) per team, NaN if unknown
+    }
+
+
+class GroupStats:
+    def __init__(self):
+        self.count = 0
+        self.wins = [0, 0]
+        self.draws = 0
+        self.duration = 0.0
+
+    def win_rate(self, team=0):
+        return self.wins[team] / self.count if self.count else 0.0
+
+    @property
+    def mean_duration(self):
+        return self.duration / self.count if self.count else 0.0
+
+    def __repr__(self):
+        return f"GroupStats(count={self.count}, wins={self.wins}, draws={self.draws}, mean_duration={self.mean_duration:.2f})"
+
+
+class ResultsStore:
+    """Append-only columnar store of battle results, in memory-mapped chunks.
+
+    A store is a directory with meta.json and one sub-directory per chunk
+    holding a .npy file per column, each preallocated for chunk_rows rows.
+    append() only queues the result; a background thread converts it to a
+    row and writes it straight into the current chunk's memory maps. Rows
+    become visible to readers when flush() (or close(), or a full chunk)
+    commits the row count to meta.json.
+
+    Queries stream over the chunks as read-only memory maps, so a filter or
+    aggregate over millions of rows only pages in the columns it touches.
+    A `where` predicate takes a chunk (column name -> array) and returns a
+    boolean mask; see mix(), scenario(), centroid_in() and both().
+
+    Scenario ids are kept twice: as a fixed-width digest (scenario_key) to
+    filter on, and as UTF-8 bytes in a per-chunk sidecar, read through the
+    virtual "scenario_id" column, so selected rows can be traced back.
+    """
+
+    def __init__(self, path, unit_types=UNIT_TYPES, chunk_rows=65536, queue_size=4096):
+        self.path = path
+        self._lock = threading.Lock()
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.unit_types = tuple(meta["unit_types"])
+            self.chunk_rows = meta["chunk_rows"]
+            self._chunk_sizes = meta["chunks"]
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.unit_types = tuple(unit_types)
+            self.chunk_rows = chunk_rows
+            self._chunk_sizes = []
+        self.columns = _columns(self.unit_types)
+        self._type_index = {name: i for i, name in enumerate(self.unit_types)}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._maps = None          # Column memory maps of the chunk being written
+        self._ids = None           # Its scenario_id.bin, open for appending
+        self._rows = 0             # Rows written into that chunk (committed or not)
+        self.error = None          # First exception raised on the writer thread
+
+    # --- Writing ---
+
+    def append(self, result, scenario=None):
+        """Queue one BattleResult (or its dict) for writing; blocks only if the queue is full."""
+        if self.error is not None:
+            raise RuntimeError("results store writer failed") from self.error
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="results-store", daemon=True)
+            self._thread.start()
+        self._queue.put((result, scenario))
+
+    def extend(self, results, scenarios=None):
+        for result, scenario in zip(results, scenarios if scenarios is not None else itertools.repeat(None)):
+            self.append(result, scenario)
+
+    def flush(self):
+        """Wait until every queued result is written and commit the rows to meta.json."""
+        if self._thread is not None:
+            self._queue.join()
+        self._commit()
+        if self.error is not None:
+            raise RuntimeError("results store writer failed") from self.error
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._commit()
+        self._close_chunk()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is queued so rows are converted and copied in blocks
+            while batch[-1] is not None and len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            items = batch[:-1] if stop else batch
+            try:
+                if items and self.error is None:
+                    self._write(items)
+            except Exception as exc:
+                self.error = exc
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _open_chunk(self):
+        with self._lock:
+            sizes = self._chunk_sizes
+            if sizes and sizes[-1] < self.chunk_rows:
+                # Resume the last, partly filled chunk
+                index, mode, self._rows = len(sizes) - 1, "r+", sizes[-1]
+            else:
+                index, mode, self._rows = len(sizes), "w+", 0
+                sizes.append(0)
+        directory = self._chunk_dir(index)
+        os.makedirs(directory, exist_ok=True)
+        self._maps = {}
+        for name, (dtype, shape) in self.columns.items():
+            self._maps[name] = np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode=mode,
+                                                         dtype=dtype, shape=(self.chunk_rows,) + shape)
+        self._ids = open(os.path.join(directory, ID_FILE), "wb" if mode == "w+" else "r+b")
+        # Drop id bytes written after the last commit
+        self._ids.truncate(int(self._maps["scenario_id_end"][self._rows - 1]) if self._rows else 0)
+        self._ids.seek(0, os.SEEK_END)
+
+    def _close_chunk(self):
+        if self._ids is not None:
+            self._ids.close()
+            self._ids = None
+        self._maps = None
+
+    def _block(self, items):
+        """Convert (result, scenario) pairs into one in-memory array per column."""
+        block = {name: np.zeros((len(items),) + shape, dtype=dtype) for name, (dtype, shape) in self.columns.items()}
+        block["centroid"][:] = np.nan
+        block["ids"] = []
+        for row, (result, scenario) in enumerate(items):
+            if isinstance(result, dict):
+                result = BattleResult.from_dict(result)
+            block["scenario_key"][row] = scenario_key(result.scenario_id)
+            block["ids"].append(str(result.scenario_id).encode())
+            block["scenario_id_end"][row] = len(block["ids"][-1])
+            block["winner"][row] = -1 if result.winner is None else result.winner
+            block["ticks"][row] = result.ticks
+            block["duration"][row] = result.duration
+            block["stopped_early"][row] = result.stopped_early
+            block["survivors"][row] = result.survivors
+            block["health"][row] = result.health
+            if result.units is not None:
+                for team, stats in enumerate(result.units):
+                    for name, (count, alive, damage) in stats.items():
+                        index = self._type_index.get(name)
+                        if index is not None:
+                            block["count"][row, team, index] = count
+                            block["alive"][row, team, index] = alive
+                            block["damage"][row, team, index] = damage
+            if scenario is not None:
+                block["centroid"][row] = placement_centroids(scenario)
+        return block
+
+    def _write(self, items):
+        block = self._block(items)
+        done = 0
+        while done < len(items):
+            if self._maps is None:
+                self._open_chunk()
+            row = self._rows
+            n = min(len(items) - done, self.chunk_rows - row)
+            for name, column in self._maps.items():
+                column[row:row + n] = block[name][done:done + n]
+            # The block holds id lengths; the chunk keeps running end offsets into its id file
+            ends = self._maps["scenario_id_end"]
+            ends[row:row + n] = np.cumsum(ends[row:row + n]) + (ends[row - 1] if row else 0)
+            self._ids.write(b"".join(block["ids"][done:done + n]))
+            self._rows = row + n
+            done += n
+            if self._rows == self.chunk_rows:
+                self._commit()
+                self._close_chunk()
+
+    def _commit(self):
+        maps = self._maps
+        if maps is not None:
+            self._ids.flush()
+            for column in maps.values():
+                column.flush()
+        with self._lock:
+            if maps is not None:
+                self._chunk_sizes[-1] = self._rows
+            meta = {"unit_types": list(self.unit_types), "chunk_rows": self.chunk_rows,
+                    "chunks": list(self._chunk_sizes)}
+        temp = os.path.join(self.path, META_FILE + ".tmp")
+        with open(temp, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp, os.path.join(self.path, META_FILE))
+
+    def _chunk_dir(self, index):
+        return os.path.join(self.path, f"chunk_{index:05d}")
+
+    # --- Reading ---
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._chunk_sizes)
+
+    def type_index(self, unit_type):
+        return self._type_index[unit_type]
+
+    def chunks(self):
+        """Yield a view per chunk mapping column names to read-only memory maps of its committed rows."""
+        with self._lock:
+            sizes = list(self._chunk_sizes)
+        for index, rows in enumerate(sizes):
+            if rows:
+                yield _ChunkView(self._chunk_dir(index), rows)
+
+    def select(self, where=None, columns=None):
+        """Matching rows as {column: array}; only the selected rows are copied into memory.
+
+        Includes the ids as "scenario_id" (an object array of str) unless columns says otherwise.
+        """
+        names = tuple(columns) if columns is not None else tuple(self.columns) + ("scenario_id",)
+        parts = {name: [] for name in names}
+        for chunk in self.chunks():
+            mask = where(chunk) if where is not None else slice(None)
+            for name in names:
+                parts[name].append(np.asarray(chunk[name][mask]))
+        return {name: np.concatenate(arrays) if arrays else _empty(self.columns, name)
+                for name, arrays in parts.items()}
+
+    def count(self, where=None):
+        total = 0
+        for chunk in self.chunks():
+            total += int(np.count_nonzero(where(chunk))) if where is not None else len(chunk)
+        return total
+
+    def group_by(self, key, where=None):
+        """{key value: GroupStats} for matching rows.
+
+        key is a column name or a function of the chunk returning one value
+        (or one row of values, grouped as a tuple) per result.
+        """
+        groups = {}
+        for chunk in self.chunks():
+            mask = where(chunk) if where is not None else slice(None)
+            keys = chunk[key] if isinstance(key, str) else key(chunk)
+            keys = np.asarray(keys[mask])
+            if not len(keys):
+                continue
+            flat = keys.reshape(len(keys), -1)
+            values, inverse = np.unique(flat, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            winners = np.asarray(chunk["winner"][mask])
+            durations = np.asarray(chunk["duration"][mask], dtype=np.float64)
+            counts = np.bincount(inverse, minlength=len(values))
+            wins0 = np.bincount(inverse, weights=winners == 0, minlength=len(values))
+            wins1 = np.bincount(inverse, weights=winners == 1, minlength=len(values))
+            duration = np.bincount(inverse, weights=durations, minlength=len(values))
+            for i, value in enumerate(values):
+                group_key = value.item() if value.size == 1 else tuple(v.item() for v in value)
+                stats = groups.get(group_key)
+                if stats is None:
+                    stats = groups[group_key] = GroupStats()
+                stats.count += int(counts[i])
+                stats.wins[0] += int(wins0[i])
+                stats.wins[1] += int(wins1[i])
+                stats.draws += int(counts[i] - wins0[i] - wins1[i])
+                stats.duration += float(duration[i])
+        return groups
+
+    def win_rate(self, team=0, where=None):
+        total = wins = 0
+        for chunk in self.chunks():
+            winners = chunk["winner"]
+            if where is not None:
+                winners = winners[where(chunk)]
+            total += len(winners)
+            wins += int(np.count_nonzero(winners == team))
+        return wins / total if total else 0.0
+
+    # --- Predicates ---
+
+    def mix(self, team, exact=False, **counts):
+        """Rows where team has at least (or, with exact, exactly) the given units per type."""
+        indices = [(self._type_index[name], count) for name, count in counts.items()]
+
+        def where(chunk):
+            placed = chunk["count"][:, team]
+            mask = np.ones(len(placed), dtype=bool)
+            for index, count in indices:
+                mask &= placed[:, index] == count if exact else placed[:, index] >= count
+            return mask
+        return where
+
+    @staticmethod
+    def scenario(scenario_id):
+        """Rows recorded for the given scenario id."""
+        key = scenario_key(scenario_id)
+
+        def where(chunk):
+            return chunk["scenario_key"] == key
+        return where
+
+    @staticmethod
+    def centroid_in(team, x=None, y=None):
+        """Rows whose team placement center lies within the given tile (low, high) ranges."""
+        def where(chunk):
+            centroid = chunk["centroid"][:, team]
+            mask = np.ones(len(centroid), dtype=bool)
+            for axis, bounds in enumerate((x, y)):
+                if bounds is not None:
+                    mask &= (centroid[:, axis] >= bounds[0]) & (centroid[:, axis] <= bounds[1])
+            return mask
+        return where
+
+    @staticmethod
+    def both(*predicates):
+        def where(chunk):
+            mask = predicates[0](chunk)
+            for predicate in predicates[1:]:
+                mask = mask & predicate(chunk)
+            return mask
+        return where
+
+
+class _ChunkView:
+    """Column access for one chunk; each column is memory-mapped on first use."""
+
+    def __init__(self, directory, rows):
+        self.directory = directory
+        self.rows = rows
+        self._columns = {}
+
+    def __getitem__(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            if name == "scenario_id":
+                column = _IdColumn(os.path.join(self.directory, ID_FILE), self["scenario_id_end"])
+            else:
+                column = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")[:self.rows]
+            self._columns[name] = column
+        return column
+
+    def __len__(self):
+        return self.rows
+
+
+class _IdColumn:
+    """A chunk's scenario ids; indexing with a mask or slice decodes only the selected rows."""
+
+    def __init__(self, path, ends):
+        self.ends = ends
+        self.starts = np.concatenate(([0], ends[:-1]))
+        self._bytes = np.memmap(path, dtype=np.uint8, mode="r") if len(ends) and ends[-1] else np.zeros(0, np.uint8)
+
+    def __getitem__(self, rows):
+        starts, ends = self.starts[rows], self.ends[rows]
+        ids = np.empty(len(starts), dtype=object)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            ids[i] = self._bytes[start:end].tobytes().decode()
+        return ids
+
+    def __len__(self):
+        return len(self.ends)
+
+
+def _empty(columns, name):
+    if name == "scenario_id":
+        return np.empty(0, dtype=object)
+    dtype, shape = columns[name]
+    return np.empty((0,) + shape, dtype=dtype)
+
+
+def scenario_key(scenario_id):
+    """Fixed-width 64-bit key for a scenario id of any length."""
+    return int.from_bytes(hashlib.blake2b(str(scenario_id).encode(), digest_size=8).digest(), "little")
+
+
+def placement_centroids(scenario):
+    """(2, 2) mean placement footprint center in tiles (0-based) per team; NaN for an empty team."""
+    sums = np.zeros((2, 2))
+    counts = np.zeros(2)
+    for p in scenario.placements:
+        w, h = footprint(p.unit_type)
+        sums[p.team] += (p.grid_pos[0] - 1 + w / 2, p.grid_pos[1] - 1 + h / 2)
+        counts[p.team] += 1
+    with np.errstate(invalid="ignore"):
+        return sums / counts[:, None]
@@ -0,0 +1,193 @@
+import itertools
+import json
+from collections import namedtuple
+
+from game.board import Board
+from game.units import Unit, Building, Marksman, Arclight, CrawlerGroup, spawn_batch
+
+# Unit types a scenario may reference, by name
+UNIT_REGISTRY = {
+    "Building": Building,
+    "Marksman": Marksman,
+    "Arclight": Arclight,
+    "CrawlerGroup": CrawlerGroup,
+}
+
+# Team 0 is the bottom player, team 1 the top (same as main.py)
+TEAM_COLORS = {0: (40, 240, 40), 1: (40, 40, 240)}
+
+# One unit (or group) to place: grid_pos is the top-left tile, overrides are constructor kwargs
+Placement = namedtuple("Placement", ["unit_type", "grid_pos", "team", "overrides"])
+
+
+def register_unit(name, unit_class):
+    UNIT_REGISTRY[name] = unit_class
+
+
+def footprint(unit_type):
+    """(width, height) in tiles of a registered unit type."""
+    return UNIT_REGISTRY[unit_type].GRID_SIZE
+
+
+def placement(unit_type, x, y, team, **overrides):
+    if unit_type not in UNIT_REGISTRY:
+        raise KeyError(f"Unknown unit type {unit_type!r}; registered: {sorted(UNIT_REGISTRY)}")
+    return Placement(unit_type, (x, y), team, overrides)
+
+
+def parse_placement(entry):
+    """Accepts ["Marksman", 6, 16, 0, {...}] or {"type": ..., "pos": [x, y], "team": ..., ...}."""
+    if isinstance(entry, Placement):
+        return entry
+    if isinstance(entry, dict):
+        x, y = entry["pos"]
+        return placement(entry["type"], x, y, entry.get("team", 0), **entry.get("overrides", {}))
+    unit_type, x, y, team = entry[:4]
+    overrides = entry[4] if len(entry) > 4 else {}
+    return placement(unit_type, x, y, team, **overrides)
+
+
+class Scenario:
+    def __init__(self, placements, scenario_id=None):
+        self.id = scenario_id
+        self.placements = tuple(parse_placement(p) for p in placements)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["units"], scenario_id=data.get("id"))
+
+    def to_dict(self):
+        units = []
+        for p in self.placements:
+            entry = [p.unit_type, p.grid_pos[0], p.grid_pos[1], p.team]
+            if p.overrides:
+                entry.append(p.overrides)
+            units.append(entry)
+        return {"id": self.id, "units": units}
+
+    def build(self, tile_size, colors=None):
+        """Instantiate the units.
+
+        Returns (team0_units, team1_units, team0, team1): the placed objects
+        per team and the flattened per-unit lists used by the game loop.
+        """
+        colors = colors if colors is not None else TEAM_COLORS
+        placed = ([], [])
+        flat = ([], [])
+        for p in self.placements:
+            unit_class = UNIT_REGISTRY[p.unit_type]
+            # Overrides win over the team defaults (a placement may bring its own color)
+            kwargs = {"tile_size": tile_size, "color": colors[p.team]}
+            kwargs.update(p.overrides)
+            if issubclass(unit_class, Unit):
+                # Single units are cloned from a cached archetype; groups spawn their members the same way
+                unit = spawn_batch(unit_class, [p.grid_pos], p.team, **kwargs)[0]
+            else:
+                unit = unit_class(grid_pos=p.grid_pos, team=p.team, **kwargs)
+            placed[p.team].append(unit)
+            flat[p.team].extend(unit.get_units())
+        return placed[0], placed[1], flat[0], flat[1]
+
+    def mirrored(self, flip_x=False):
+        """Swap the two sides: reflect every placement across the midline and swap teams."""
+        placements = []
+        for p in self.placements:
+            w, h = footprint(p.unit_type)
+            x, y = p.grid_pos
+            if flip_x:
+                x = Board.TOTAL_WIDTH - x - w + 2
+            y = Board.TOTAL_HEIGHT - y - h + 2
+            placements.append(Placement(p.unit_type, (x, y), 1 - p.team, p.overrides))
+        scenario_id = f"{self.id}-mirror" if self.id is not None else None
+        return Scenario(placements, scenario_id=scenario_id)
+
+    def __add__(self, other):
+        return Scenario(self.placements + other.placements, scenario_id=self.id)
+
+    def __repr__(self):
+        return f"Scenario({self.id!r}, {len(self.placements)} placements)"
+
+
+def load_scenario(path):
+    with open(path) as f:
+        return Scenario.from_dict(json.load(f))
+
+
+def save_scenario(scenario, path):
+    with open(path, "w") as f:
+        json.dump(scenario.to_dict(), f)
+
+
+def iter_scenarios(path):
+    """Stream scenarios from a JSON-lines file, one at a time."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield Scenario.from_dict(json.loads(line))
+
+
+def write_scenarios(scenarios, path):
+    """Write any iterable of scenarios as JSON lines without holding them in memory."""
+    count = 0
+    with open(path, "w") as f:
+        for scenario in scenarios:
+            f.write(json.dumps(scenario.to_dict()) + "\n")
+            count += 1
+    return count
+
+
+# --- Parametric sweeps (all lazy) ---
+
+def position_grid(unit_type, team, xs, ys, **overrides):
+    """Alternatives for one slot: the unit at every (x, y) in xs x ys."""
+    for x, y in itertools.product(xs, ys):
+        yield placement(unit_type, x, y, team, **overrides)
+
+
+def unit_mixes(unit_types, team, positions, count):
+    """Alternatives for a group of slots: every choice of `count` unit types on the given positions."""
+    for mix in itertools.combinations_with_replacement(unit_types, count):
+        yield tuple(placement(unit_type, x, y, team) for unit_type, (x, y) in zip(mix, positions))
+
+
+def sweep(slots, base=None, mirror=False, prefix="sweep"):
+    """Yield one Scenario per combination of slot alternatives.
+
+    Each slot is an iterable of alternatives; an alternative is a Placement
+    or a tuple of Placements (e.g. from unit_mixes). Only the slot
+    alternatives are held in memory, never the product, so sweeps of
+    millions of variations stream with constant memory. With mirror=True
+    each variation is followed by its mirrored layout.
+    """
+    base_placements = base.placements if base is not None else ()
+    options = [tuple(slot) for slot in slots]
+    for index, combo in enumerate(itertools.product(*options)):
+        placements = list(base_placements)
+        for choice in combo:
+            if isinstance(choice, Placement):
+                placements.append(choice)
+            else:
+                placements.extend(choice)
+        scenario = Scenario(placements, scenario_id=f"{prefix}-{index}")
+        yield scenario
+        if mirror:
+            yield scenario.mirrored()
+
+
+def sweep_size(slots, mirror=False):
+    """Number of scenarios sweep() would yield, without generating them (slots must be re-iterable)."""
+    total = 1
+    for slot in slots:
+        total *= len(tuple(slot))
+    return total * (2 if mirror else 1)
+
+
+# The layout main.py starts with
+DEFAULT_SCENARIO = Scenario([
+    ["Building", 9, 17, 0],
+    ["Marksman", 6, 16, 0],
+    ["CrawlerGroup", 8, 14, 0],
+    ["Building", 9, 3, 1],
+    ["Arclight", 6, 4, 1],
+    ["CrawlerGroup", 6, 6, 1],
+], scenario_id="default")
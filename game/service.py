@@ -0,0 +1,353 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from game.optimizer import prune_when
+from game.scenarios import Scenario
+from game.simulation import Battle, BattleResult, MAX_BATTLE_TIME
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Job options passed through to Battle; the rest are run() controls
+BATTLE_OPTIONS = ("dt", "flow_field_refresh", "adaptive", "max_dt", "group_lod", "analytic_projectiles")
+RUN_OPTIONS = ("max_time", "prune_after", "prune_margin")
+STREAM_TIMEOUT = 600.0   # Seconds a result stream waits for the next result before giving up
+
+
+# --- Worker side ---
+
+def _init_worker():
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # Pay the unit imports and first-battle costs once per worker, not per job
+    from game.scenarios import DEFAULT_SCENARIO
+    Battle(DEFAULT_SCENARIO).step()
+
+
+def run_battle(scenario_data, options):
+    """Simulate one scenario dict in a worker; returns the BattleResult as a dict."""
+    battle = Battle(Scenario.from_dict(scenario_data), **{k: options[k] for k in BATTLE_OPTIONS if k in options})
+    prune_after = options.get("prune_after")
+    stop_when = prune_when(prune_after, options.get("prune_margin", 0.5)) if prune_after is not None else None
+    return battle.run(max_time=options.get("max_time", MAX_BATTLE_TIME), stop_when=stop_when).to_dict()
+
+
+# --- Server side ---
+
+class Job:
+    """One submission: results are kept in completion order, tagged with their scenario index."""
+
+    def __init__(self, job_id, total):
+        self.id = job_id
+        self.total = total
+        self.results = []        # (index, result dict or {"error": ...})
+        self.errors = 0
+        self._changed = threading.Condition()
+
+    def add(self, index, result):
+        with self._changed:
+            self.results.append((index, result))
+            self._changed.notify_all()
+
+    @property
+    def done(self):
+        return len(self.results) >= self.total
+
+    def status(self):
+        return {"job": self.id, "total": self.total, "completed": len(self.results), "errors": self.errors,
+                "done": self.done}
+
+    def stream(self, timeout=STREAM_TIMEOUT):
+        """Yield (index, result) pairs as they complete until the job is done.
+
+        Returns early if no result arrives for timeout seconds (None waits forever).
+        """
+        sent = 0
+        while True:
+            with self._changed:
+                while sent == len(self.results) and not self.done:
+                    if not self._changed.wait(timeout):
+                        return
+                pending = self.results[sent:]
+            for item in pending:
+                yield item
+            sent += len(pending)
+            if sent >= self.total:
+                return
+
+
+class SimulationService:
+    """Job queue in front of a warm process pool.
+
+    Workers start once with the dummy SDL driver, import the unit classes
+    and run a throwaway battle, so a job only pays for its own simulation.
+    submit() validates the scenarios and queues them; a dispatcher thread
+    feeds the pool while keeping at most max_in_flight battles submitted.
+    Each job keeps its own queue and the dispatcher takes one battle from
+    each waiting job in turn, so a job submitted behind a huge one starts
+    as soon as a slot frees. Results are appended to their job as they
+    finish. A battle
+    that fails, is cancelled or cannot be submitted is recorded as an error
+    result; a pool that breaks is replaced for the battles still queued.
+    """
+
+    def __init__(self, workers=None, max_in_flight=None):
+        self.workers = workers or os.cpu_count()
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.executor = self._new_executor()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._pending = deque()          # Jobs with battles left to submit: (job, options, deque of (index, scenario dict))
+        self._wake = threading.Condition()
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="service-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def submit(self, scenarios, options=None):
+        options = dict(options or {})
+        unknown = set(options) - set(BATTLE_OPTIONS) - set(RUN_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job options: {sorted(unknown)}")
+        # Parse up front so a malformed scenario fails the request, not a worker
+        scenario_data = [Scenario.from_dict(data).to_dict() for data in scenarios]
+        job = Job(next(self._ids), len(scenario_data))
+        self.jobs[job.id] = job
+        with self._wake:
+            if scenario_data:
+                self._pending.append((job, options, deque(enumerate(scenario_data))))
+            self._wake.notify()
+        return job
+
+    def _dispatch(self):
+        while True:
+            # Hold a slot before picking, so the pick sees every job queued while the pool was full
+            self._slots.acquire()
+            with self._wake:
+                while not self._pending and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                # Round robin: one battle from the front job, which goes to the back if it has more
+                entry = self._pending.popleft()
+                job, options, battles = entry
+                index, data = battles.popleft()
+                if battles:
+                    self._pending.append(entry)
+            try:
+                future = self.executor.submit(run_battle, data, options)
+            except Exception as exc:
+                # A broken or shut down pool: fail this battle and start a fresh pool for the rest
+                self._slots.release()
+                self._fail(job, index, exc)
+                with self._wake:
+                    if self._closed:
+                        return
+                    broken, self.executor = self.executor, self._new_executor()
+                broken.shutdown(wait=False, cancel_futures=True)
+                continue
+            future.add_done_callback(lambda f, job=job, index=index: self._finish(job, index, f))
+
+    def _finish(self, job, index, future):
+        self._slots.release()
+        if future.cancelled():
+            self._fail(job, index, "cancelled")
+        elif future.exception() is not None:
+            self._fail(job, index, future.exception())
+        else:
+            job.add(index, future.result())
+
+    @staticmethod
+    def _fail(job, index, exc):
+        job.errors += 1
+        job.add(index, {"error": exc if isinstance(exc, str) else repr(exc)})
+
+    def close(self):
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+            executor = self.executor
+            pending, self._pending = self._pending, deque()
+        executor.shutdown(cancel_futures=True)
+        # Fail what was never submitted so streams of those jobs end
+        for job, _, battles in pending:
+            for index, _ in battles:
+                self._fail(job, index, "service closed")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """POST /jobs, GET /jobs/<id>, GET /jobs/<id>/results, DELETE /jobs/<id> and POST /simulate (submit and stream)."""
+
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_submission(self):
+        """Body is {"scenarios": [...], "options": {...}}, a single scenario, or scenario JSON lines."""
+        length = int(self.headers.get("Content-Length", 0))
+        text = self.rfile.read(length).decode()
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return [json.loads(line) for line in text.splitlines() if line.strip()], {}
+        if "scenarios" in data:
+            return data["scenarios"], data.get("options", {})
+        return [data], {}
+
+    def _stream(self, job):
+        # NDJSON, one result per line as it completes; the response ends when the job does
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for index, result in job.stream():
+            self.wfile.write((json.dumps({"index": index, "result": result}) + "\n").encode())
+            self.wfile.flush()
+        if not job.done:
+            self.wfile.write((json.dumps({"error": f"no result within {STREAM_TIMEOUT:g}s"}) + "\n").encode())
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["health"]:
+            return self._send_json(200, {"workers": self.service.workers, "jobs": len(self.service.jobs)})
+        if len(parts) >= 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.service.jobs.get(int(parts[1]))
+            if job is None:
+                return self._send_json(404, {"error": "no such job"})
+            if parts[2:] == ["results"]:
+                return self._stream(job)
+            if not parts[2:]:
+                return self._send_json(200, job.status())
+        self._send_json(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.service.jobs.get(int(parts[1]))
+            if job is not None and job.done:
+                del self.service.jobs[job.id]
+                return self._send_json(200, job.status())
+            return self._send_json(404 if job is None else 409, {"error": "no such job" if job is None else "job still running"})
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = self.path.strip("/")
+        if path not in ("jobs", "simulate"):
+            return self._send_json(404, {"error": "not found"})
+        try:
+            scenarios, options = self._read_submission()
+            job = self.service.submit(scenarios, options)
+        except (ValueError, KeyError, TypeError) as exc:
+            return self._send_json(400, {"error": repr(exc)})
+        if path == "simulate":
+            # Nobody can ask for this job again once its stream is done
+            try:
+                self._stream(job)
+            finally:
+                self.service.jobs.pop(job.id, None)
+            return
+        self._send_json(202, job.status())
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    service = SimulationService(workers)
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, service
+
+
+class ServiceClient:
+    """Talks to a running service; results come back as BattleResults."""
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    @staticmethod
+    def _payload(scenarios, options):
+        return {"scenarios": [s.to_dict() if isinstance(s, Scenario) else s for s in scenarios], "options": options}
+
+    def submit(self, scenarios, **options):
+        with self._request("/jobs", self._payload(scenarios, options)) as response:
+            return json.load(response)["job"]
+
+    def status(self, job_id):
+        with self._request(f"/jobs/{job_id}") as response:
+            return json.load(response)
+
+    def _read(self, response):
+        with response:
+            for line in response:
+                item = json.loads(line)
+                if "result" not in item:
+                    raise RuntimeError(f"Job stream ended early: {item['error']}")
+                result = item["result"]
+                if "error" in result:
+                    raise RuntimeError(f"Scenario {item['index']} failed: {result['error']}")
+                yield item["index"], BattleResult.from_dict(result)
+
+    def forget(self, job_id):
+        """Drop a finished job's results from the server."""
+        request = urllib.request.Request(f"{self.url}/jobs/{job_id}", method="DELETE")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def results(self, job_id):
+        """Stream (index, BattleResult) pairs of a submitted job in completion order."""
+        return self._read(self._request(f"/jobs/{job_id}/results"))
+
+    def simulate(self, scenarios, **options):
+        """Submit and stream (index, BattleResult) pairs over one connection."""
+        return self._read(self._request("/simulate", self._payload(scenarios, options)))
+
+    def map(self, scenarios, **options):
+        """BattleResults in scenario order."""
+        scenarios = list(scenarios)
+        results = [None] * len(scenarios)
+        for index, result in self.simulate(scenarios, **options):
+            results[index] = result
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local battle simulation service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    server, service = serve(args.host, args.port, args.workers)
+    print(f"Simulation service on http://{args.host}:{args.port} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import math
+
+from game.alive_set import AliveSet
+from game.alloc_profile import ALLOCS
+from game.board import Board
+from game.event_log import EVENTS
+from game.flow_field import FlowField
+from game.impacts import ImpactQueue
+
+SIM_DT = 0.02
+MAX_DT = 0.1             # Largest step the adaptive integrator takes when nothing is near contact
+MAX_BATTLE_TIME = 120.0  # Seconds of simulated time before a battle is called a draw
+
+
+def step(team0, team1, projectiles, tile_size, x_offset, y_offset, current_time, dt, flow_fields=None):
+    """Advance the battle by one tick.
+
+    team0 and team1 are AliveSets: units that die during the tick leave them
+    immediately. projectiles is a list of stepped projectiles, mutated in
+    place, or an ImpactQueue, which only lands the impacts due this tick.
+    """
+    EVENTS.time = current_time
+    tracking = ALLOCS.active
+    if tracking:
+        ALLOCS.begin_tick()
+    for unit in team0:
+        unit.update_rect_position(tile_size, x_offset, y_offset)
+    for unit in team1:
+        unit.update_rect_position(tile_size, x_offset, y_offset)
+    if tracking:
+        ALLOCS.mark("update_rects")
+    field0, field1 = flow_fields if flow_fields is not None else (None, None)
+    if flow_fields is not None:
+        # Skip a team's rebuild while none of its units would sample it; aggregated groups fall back to one direct query
+        if _steered(team0):
+            field0.update(team1, team0)
+        else:
+            field0.invalidate()
+            field0 = None
+        if _steered(team1):
+            field1.update(team0, team1)
+        else:
+            field1.invalidate()
+            field1 = None
+        if tracking:
+            ALLOCS.mark("flow_fields")
+    for unit in team0:
+        # Aggregated CrawlerGroups move all their members at once (see CrawlerGroup.act)
+        group = unit.group
+        if group is not None and group.aggregate and group.act(team1, tile_size, x_offset, y_offset, current_time, dt, field0):
+            continue
+        unit.act(team0, team1, tile_size, x_offset, y_offset, current_time, dt, projectiles, flow_field=field0)
+    for unit in team1:
+        group = unit.group
+        if group is not None and group.aggregate and group.act(team0, tile_size, x_offset, y_offset, current_time, dt, field1):
+            continue
+        unit.act(team1, team0, tile_size, x_offset, y_offset, current_time, dt, projectiles, flow_field=field1)
+    if tracking:
+        ALLOCS.mark("act")
+    if hasattr(projectiles, "advance"):
+        projectiles.advance(current_time)
+    else:
+        for projectile in projectiles[:]:
+            projectile.update(dt)
+            if not projectile.active:
+                projectiles.remove(projectile)
+    if tracking:
+        ALLOCS.mark("projectiles")
+
+
+def _steered(units):
+    """True if any unit would follow the team flow field this tick (mobile melee units outside aggregated groups)."""
+    for unit in units:
+        if unit.movement_speed > 0 and not getattr(unit, "is_ranged", False):
+            group = unit.group
+            if group is None or not group.aggregate:
+                return True
+    return False
+
+
+def _follows_flow(unit, flow_field):
+    """True if Unit.act would move the unit along the steering field (see its step 2)."""
+    if unit.movement_speed <= 0 or getattr(unit, "is_ranged", False):
+        return False
+    group = unit.group
+    if group is not None and group.aggregate:
+        return False
+    return flow_field.engage_distance < flow_field.distance_at(unit) < float("inf")
+
+
+def _tile_exit_time(unit, flow_field, tile_size):
+    """Time until a unit moving along the field's heading leaves the tile it samples the field at."""
+    hx, hy = flow_field.heading_at(unit)
+    x = unit.pixel_pos[0] + unit.size[0] * tile_size * 0.5
+    y = unit.pixel_pos[1] + unit.size[1] * tile_size * 0.5
+    best = float("inf")
+    for p, h in ((x, hx), (y, hy)):
+        if h > 0:
+            best = min(best, (tile_size - p % tile_size) / (unit.movement_speed * h))
+        elif h < 0:
+            best = min(best, (p % tile_size) / (unit.movement_speed * -h))
+    return best
+
+
+def _exact_gap(unit, enemies):
+    """Distance the unit still has to cover before any enemy is in attack or melee reach."""
+    cx, cy = getattr(unit, "collider_center", unit.pixel_pos)
+    radius = getattr(unit, "collider_radius", 0)
+    best = float("inf")
+    for enemy in enemies:
+        ex, ey = getattr(enemy, "collider_center", enemy.pixel_pos)
+        gap = math.hypot(ex - cx, ey - cy) - max(unit.attack_range, radius + getattr(enemy, "collider_radius", 0))
+        if gap < best:
+            best = gap
+    return best
+
+
+def unit_stats(units):
+    """{unit type: [count, alive, damage dealt]} over a roster (group members count individually)."""
+    stats = {}
+    for unit in units:
+        entry = stats.get(type(unit).__name__)
+        if entry is None:
+            entry = stats[type(unit).__name__] = [0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += 1 if unit.alive else 0
+        entry[2] += unit.damage_dealt
+    return stats
+
+
+def health_fraction(units):
+    max_total = sum(unit.max_health for unit in units)
+    if not max_total:
+        return 0.0
+    return sum(max(unit.health, 0) for unit in units) / max_total
+
+
+class BattleResult:
+    """Outcome of one headless battle. winner is 0, 1 or None for a draw/timeout."""
+
+    def __init__(self, scenario_id, winner, ticks, duration, survivors, health, stopped_early=False, units=None):
+        self.scenario_id = scenario_id
+        self.winner = winner
+        self.ticks = ticks
+        self.duration = duration
+        self.survivors = survivors        # (team0, team1) alive unit counts
+        self.health = health              # (team0, team1) remaining health fraction
+        self.stopped_early = stopped_early
+        self.units = units                # Optional (team0, team1) unit_stats dicts
+
+    def to_dict(self):
+        return {
+            "scenario_id": self.scenario_id,
+            "winner": self.winner,
+            "ticks": self.ticks,
+            "duration": self.duration,
+            "survivors": list(self.survivors),
+            "health": list(self.health),
+            "stopped_early": self.stopped_early,
+            "units": list(self.units) if self.units is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        units = data.get("units")
+        return cls(data["scenario_id"], data["winner"], data["ticks"], data["duration"],
+                   tuple(data["survivors"]), tuple(data["health"]), data.get("stopped_early", False),
+                   tuple(units) if units is not None else None)
+
+    def __repr__(self):
+        return (f"BattleResult({self.scenario_id!r}, winner={self.winner}, duration={self.duration:.2f}s, "
+                f"survivors={self.survivors}, health=({self.health[0]:.2f}, {self.health[1]:.2f}))")
+
+
+class Battle:
+    """Headless battle built from a Scenario, stepped exactly like main.play_mode.
+
+    With adaptive=True each tick picks its own dt between dt and max_dt (see
+    choose_dt), so the approach phase and idle cooldowns take few, large
+    steps while contacts, attacks and projectile impacts still land on fine
+    steps. Outcomes stay close to the fixed-step result at a fraction of the
+    ticks.
+
+    With group_lod=True every CrawlerGroup moves as one aggregate agent until
+    it nears an enemy (see CrawlerGroup.act); outcomes are approximate.
+
+    With analytic_projectiles=True shots are scheduled on an ImpactQueue
+    when fired instead of being stepped every tick (see game/impacts.py).
+    """
+
+    def __init__(self, scenario, window_width=800, window_height=600, dt=SIM_DT, flow_field_refresh=1,
+                 adaptive=False, max_dt=MAX_DT, group_lod=False, analytic_projectiles=False):
+        self.scenario = scenario
+        self.board = Board(surface=None, window_width=window_width, window_height=window_height)
+        self.tile_size, self.x_offset, self.y_offset = self.board.metrics
+        self.dt = dt
+        self.adaptive = adaptive
+        self.max_dt = max_dt
+        self.team0_units, self.team1_units, units0, units1 = scenario.build(self.board.tile_size)
+        if group_lod:
+            for placed in self.team0_units + self.team1_units:
+                if hasattr(placed, "set_lod"):
+                    placed.set_lod(True)
+        # Initial rosters, kept for health accounting after units drop out of the alive sets
+        self.roster0 = units0
+        self.roster1 = units1
+        self.team0 = AliveSet(units0)
+        self.team1 = AliveSet(units1)
+        self.projectiles = ImpactQueue() if analytic_projectiles else []
+        self.flow_fields = None
+        if flow_field_refresh:
+            self.flow_fields = (FlowField(self.board.tile_size, refresh_interval=flow_field_refresh),
+                                FlowField(self.board.tile_size, refresh_interval=flow_field_refresh))
+        # Private fields for contact distances, used by adaptive steps whose steering field is stale
+        self._contact_fields = (FlowField(self.board.tile_size), FlowField(self.board.tile_size)) if adaptive else None
+        self.time = 0.0
+        self.ticks = 0
+
+    def choose_dt(self):
+        """Largest step that cannot skip a contact, an attack or a projectile impact.
+
+        - Units not yet in reach bound dt by the time to close their gap to the
+          nearest enemy at their speed plus the fastest enemy's. The gap comes
+          from the flow-field tile distance (a cheap lower bound), refined with
+          an exact search only for units the bound puts in reach.
+        - Melee units following the steering field also bound dt by the time
+          to leave their tile: the field's heading is constant within a tile,
+          so a step that crosses into the next one would keep the old heading
+          past the turn.
+        - Units in reach and holding a target bound dt by the last fine step
+          before their next attack, so attacks (and a projectile's first move)
+          happen in a fine step as at the fixed dt; units in reach but still
+          manoeuvring force the fine dt.
+        - Projectiles bound dt by their remaining flight time.
+        """
+        min_dt = self.dt
+        dt = self.max_dt
+        now = self.time
+        tile = self.tile_size
+        steering = self.flow_fields if self.flow_fields is not None else (None, None)
+        for units, enemies, field, flow in ((self.team0, self.team1, self._contact_fields[0], steering[0]),
+                                            (self.team1, self.team0, self._contact_fields[1], steering[1])):
+            if flow is not None and flow.stale:
+                flow = None
+            if flow is not None and self.ticks > 0 and flow.refresh_interval == 1:
+                # The steering field was built at the start of the last step; allow one more tile for that
+                field, slack = flow, 2
+            else:
+                # Rebuilding only reruns the BFS once an enemy has changed tiles
+                field.build(enemies)
+                slack = 1
+            enemy_speed = max((enemy.movement_speed for enemy in enemies), default=0.0)
+            for unit in units:
+                if unit.movement_speed == 0 and unit.attack_power == 0:
+                    continue
+                # Melee reach is collider contact; enemy colliders are at most one tile in radius
+                reach = max(unit.attack_range, getattr(unit, "collider_radius", 0) + tile)
+                gap = (field.distance_at(unit) - slack) * tile - reach
+                if gap <= 0:
+                    # A target already in reach settles it; otherwise search every enemy
+                    target = unit.enemy_target
+                    if target is None or not target.alive or _exact_gap(unit, (target,)) > 0:
+                        gap = _exact_gap(unit, enemies)
+                if gap > 0:
+                    closing = unit.movement_speed + enemy_speed
+                    if closing > 0:
+                        dt = min(dt, gap / closing)
+                    if flow is not None and unit.enemy_target is None and _follows_flow(unit, flow):
+                        dt = min(dt, _tile_exit_time(unit, flow, tile) + 1e-9)
+                elif unit.enemy_target is not None and unit.attack_power > 0:
+                    ready = unit.last_attack_time + unit.attack_interval - now
+                    # Stop one fine step short of the cooldown so the attack happens in a fine
+                    # step; a projectile's first move covers its whole firing tick
+                    dt = min(dt, ready - min_dt + 1e-9) if ready > min_dt else min_dt
+                else:
+                    return min_dt
+                if dt <= min_dt:
+                    return min_dt
+        if hasattr(self.projectiles, "next_impact"):
+            impact = self.projectiles.next_impact()
+            if impact is not None:
+                dt = min(dt, impact - now + 1e-9)
+        else:
+            for projectile in self.projectiles:
+                if projectile.active:
+                    dt = min(dt, projectile.time_to_impact() + 1e-9)
+        return max(dt, min_dt)
+
+    def step(self, dt=None):
+        if dt is None:
+            dt = self.choose_dt() if self.adaptive else self.dt
+        current_time = self.time + dt
+        step(self.team0, self.team1, self.projectiles, self.tile_size, self.x_offset, self.y_offset,
+             current_time, dt, self.flow_fields)
+        self.time = current_time
+        self.ticks += 1
+
+    def advance_to(self, time):
+        """Step until self.time reaches time, shortening only a step that would overshoot it."""
+        while self.time < time - 1e-9 and not self.is_over():
+            dt = self.choose_dt() if self.adaptive else self.dt
+            if self.time + dt > time + 1e-9:
+                dt = time - self.time
+            self.step(dt)
+
+    def alive_counts(self):
+        return (len(self.team0), len(self.team1))
+
+    def health(self):
+        return (health_fraction(self.roster0), health_fraction(self.roster1))
+
+    def is_over(self):
+        return not self.team0 or not self.team1
+
+    def result(self, stopped_early=False):
+        alive0, alive1 = self.alive_counts()
+        if alive0 and not alive1:
+            winner = 0
+        elif alive1 and not alive0:
+            winner = 1
+        else:
+            winner = None
+        return BattleResult(self.scenario.id, winner, self.ticks, self.time, (alive0, alive1),
+                            self.health(), stopped_early, (unit_stats(self.roster0), unit_stats(self.roster1)))
+
+    def run(self, max_time=MAX_BATTLE_TIME, check_every=50, stop_when=None):
+        """Run until one side is wiped out or max_time passes.
+
+        stop_when(battle) is polled every check_every ticks; returning True
+        ends the battle early (used to prune hopeless candidates).
+        """
+        while self.time < max_time:
+            self.step()
+            if self.is_over():
+                break
+            if stop_when is not None and self.ticks % check_every == 0 and stop_when(self):
+                return self.result(stopped_early=True)
+        return self.result()
+
+
+def simulate(scenario, **kwargs):
+    max_time = kwargs.pop("max_time", MAX_BATTLE_TIME)
+    return Battle(scenario, **kwargs).run(max_time=max_time)
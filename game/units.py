@@ -1,6 +1,14 @@
 import pygame
 import math
 
+from game.event_log import EVENTS, DEBUG, INFO
+
+# Pixels per second a unit of avoidance force pushes a unit; 1 px per tick at the 0.02 s reference step
+AVOIDANCE_RATE = 50.0
+
+# Concrete unit classes by name, in the order observation channels and stored result columns use
+UNIT_TYPES = ("Building", "Marksman", "Arclight", "Crawler")
+
 class Unit:
     def __init__(self, grid_pos, team, health, max_health, movement_speed_mps, 
                  attack_power, attack_range_m, attack_splash_range_m, attack_interval=1.0, 
@@ -19,11 +27,17 @@ class Unit:
 
         self.attack_interval = attack_interval  # seconds between attacks
         self.last_attack_time = 0  # time of last attack
+        self.damage_dealt = 0      # Health actually removed from enemies, for battle statistics
         self.size = size             # (width, height) in grid cells
         self.alive = True
         self.color = color if color is not None else ((200, 200, 200) if team == 0 else (200, 100, 100))
 
-        self.enemy_target = None  # Current target enemy unit
+        self.alive_set = None     # AliveSet holding this unit while it lives
+        self.handle = None        # Integer handle within that set
+        self.enemy_target = None  # Current target enemy unit (held by handle, see below)
+        self.group = None         # CrawlerGroup this unit belongs to, if any
+        self.changes = None       # Set a watching ObservationEncoder collects changed units in
+        self.cell_box = None      # pixel_pos range that keeps this unit on its observed tile
         
         if pixel_position is not None:
             self.pixel_pos = pixel_position
@@ -36,6 +50,21 @@ class Unit:
         x, y = grid_pos
         return ((x - 1) * tile_size, (y - 1) * tile_size)
 
+    @property
+    def enemy_target(self):
+        """Current target, or None once it has died (a generation check on its handle)."""
+        if self.target_set is not None:
+            return self.target_set.get(self.target_handle)
+        target = self._target_unit
+        # Units outside any alive set are held directly and checked the old way
+        return target if target is not None and getattr(target, "alive", True) else None
+
+    @enemy_target.setter
+    def enemy_target(self, target):
+        self.target_set = getattr(target, "alive_set", None)
+        self.target_handle = target.handle if self.target_set is not None else None
+        self._target_unit = target if self.target_set is None else None
+
     def get_units(self):
         return [self]
     
@@ -108,27 +137,29 @@ class Unit:
                     else:
                         self.attack(closest_enemy, current_time)
 
-    def act(self, allies, enemies, tile_size, x_offset, y_offset, current_time, dt, projectiles):
+    def act(self, allies, enemies, tile_size, x_offset, y_offset, current_time, dt, projectiles, flow_field=None):
         target = self.enemy_target
 
         # --- 1. Check existing target (Focusing) ---
+        # enemy_target is already None if the target has died
         if target is not None:
-            # If the target is gone or dead, drop it
-            if not getattr(target, "alive", True):
+            target_center = self._resolve_target_center(target)
+            # If target is still in (attack or melee) range, continue focusing and attack.
+            if self._perform_action_on_target(target, target_center, allies, enemies, tile_size, x_offset, y_offset, current_time, dt, projectiles):
+                return  # Keep focusing this target; skip normal target acquisition this tick
+            else:
+                # Target moved out of allowable attack range -> drop it and resume normal logic
                 self.enemy_target = None
-                target = None # Clear target for next step
+                target = None
 
-            else:
-                target_center = self._resolve_target_center(target)
-                # If target is still in (attack or melee) range, continue focusing and attack.
-                if self._perform_action_on_target(target, target_center, allies, enemies, tile_size, x_offset, y_offset, current_time, dt, projectiles):
-                    return  # Keep focusing this target; skip normal target acquisition this tick
-                else:
-                    # Target moved out of allowable attack range -> drop it and resume normal logic
-                    self.enemy_target = None
-                    target = None
+        # --- 2. Far from the enemy, melee units just follow the team flow field ---
+        if target is None and flow_field is not None and not getattr(self, "is_ranged", False):
+            if flow_field.engage_distance < flow_field.distance_at(self) < float("inf"):
+                self.follow_flow(flow_field, dt)
+                self.update_rect_position(tile_size, x_offset, y_offset)
+                return
 
-        # --- 2. Find and engage new target (Acquisition) ---
+        # --- 3. Find and engage new target (Acquisition) ---
         if target is None:
             closest_enemy, enemy_pixel = self.find_closest_enemy(enemies)
             
@@ -183,6 +214,8 @@ class Unit:
 
         # Check if we should attack
         if in_melee or in_range:
+            if EVENTS.debug and self.enemy_target is not target:
+                EVENTS.emit(DEBUG, "target", self, target, dist)
             self.enemy_target = target # Ensure target is set before attack
             if getattr(self, "is_ranged", False):
                 self.attack(target, current_time, projectiles=projectiles, all_units=enemies)
@@ -224,7 +257,13 @@ class Unit:
             avoidance_radius = max(self.size) * self.movement_speed / ((self.movement_speed / self.size[0]) if self.size[0] else 1)
         if allies:
             avoidance_dx, avoidance_dy = self.compute_avoidance_force(allies, avoidance_radius, avoidance_strength)
-        move_amount = self.movement_speed * dt
+            # Avoidance is a velocity, so separation does not depend on the step size
+            push = AVOIDANCE_RATE * dt
+            avoidance_dx *= push
+            avoidance_dy *= push
+        # Never step past the stopping distance, so large dt does not overshoot and jitter
+        arrival = max(stop_distance, self.attack_range) if target_unit is not None else stop_distance
+        move_amount = min(self.movement_speed * dt, dist - arrival)
         total_dx = move_amount * dx / dist + avoidance_dx
         total_dy = move_amount * dy / dist + avoidance_dy
         # Move pixel_pos so that collider_center moves as intended
@@ -234,6 +273,31 @@ class Unit:
         )
         if hasattr(self, 'board_width') and hasattr(self, 'board_height'):
             self.clamp_to_board(self.board_width, self.board_height)
+        if self.cell_box is not None:
+            self.report_move()
+
+    def follow_flow(self, flow_field, dt, avoidance_strength=1.0):
+        # Step along the field heading; avoidance only considers allies in nearby tiles
+        hx, hy = flow_field.heading_at(self)
+        avoidance_radius = max(self.size) * self.movement_speed / ((self.movement_speed / self.size[0]) if self.size[0] else 1)
+        avoidance_dx, avoidance_dy = self.compute_avoidance_force(flow_field.nearby_allies(self), avoidance_radius, avoidance_strength)
+        push = AVOIDANCE_RATE * dt
+        move_amount = self.movement_speed * dt
+        self.pixel_pos = (
+            self.pixel_pos[0] + move_amount * hx + avoidance_dx * push,
+            self.pixel_pos[1] + move_amount * hy + avoidance_dy * push
+        )
+        if hasattr(self, 'board_width') and hasattr(self, 'board_height'):
+            self.clamp_to_board(self.board_width, self.board_height)
+        if self.cell_box is not None:
+            self.report_move()
+
+    def report_move(self):
+        # Tell the watching ObservationEncoder once the unit leaves its tile
+        x0, y0, x1, y1 = self.cell_box
+        x, y = self.pixel_pos
+        if not (x0 <= x < x1 and y0 <= y < y1):
+            self.changes.add(self)
 
     def compute_avoidance_force(self, allies, avoidance_radius=40, avoidance_strength=1.0):
         # Returns (dx, dy) repulsion vector from nearby allies
@@ -314,19 +378,38 @@ class Unit:
                     damage=self.attack_power,
                     speed=400,
                     splash_range=self.attack_splash_range,
-                    all_units=all_units
+                    all_units=all_units,
+                    source=self
                 )
                 projectiles.append(projectile)
             else:
                 # Melee attack: apply damage directly
-                target.take_damage(self.attack_power)
+                self.damage_dealt += target.take_damage(self.attack_power, self)
+            if EVENTS.debug:
+                EVENTS.emit(DEBUG, "attack", self, target, self.attack_power, current_time)
             self.last_attack_time = current_time
+            if self.changes is not None:
+                self.changes.add(self)
 
-    def take_damage(self, amount):
+    def take_damage(self, amount, attacker=None):
+        """Apply damage; returns the health actually removed (overkill and hits on the dead count 0).
+
+        attacker is only used to credit kills in the event log.
+        """
+        dealt = min(amount, max(self.health, 0))
         self.health -= amount
+        if self.changes is not None:
+            self.changes.add(self)
         if self.health <= 0:
+            if self.alive:
+                if EVENTS.active:
+                    EVENTS.emit(INFO, "kill", attacker, self, amount)
+                # Drop out of the team's alive set right away
+                if self.alive_set is not None:
+                    self.alive_set.remove(self)
             self.health = 0
             self.alive = False
+        return dealt
 
 
 class Building(Unit, pygame.sprite.Sprite):
@@ -339,8 +422,11 @@ class Building(Unit, pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.update_rect_position(tile_size=32, x_offset=0, y_offset=0)
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)    
+    def draw(self, surface, viewport=None):
+        if viewport is not None:
+            viewport.blit(surface, self.image, self.rect)
+        else:
+            surface.blit(self.image, self.rect)    
 
     def update_sprite(self):
         pass
@@ -390,8 +476,11 @@ class Marksman(Unit, pygame.sprite.Sprite):
     def update(self, tile_size, x_offset=0, y_offset=0):
         self.update_rect_position(tile_size, x_offset, y_offset)
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+    def draw(self, surface, viewport=None):
+        if viewport is not None:
+            viewport.blit(surface, self.image, self.rect)
+        else:
+            surface.blit(self.image, self.rect)
 
     def check_collision(self, other_sprite):
         # Circle collider collision
@@ -453,8 +542,11 @@ class Arclight(Unit, pygame.sprite.Sprite):
     def update(self, tile_size, x_offset=0, y_offset=0):
         self.update_rect_position(tile_size, x_offset, y_offset)
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+    def draw(self, surface, viewport=None):
+        if viewport is not None:
+            viewport.blit(surface, self.image, self.rect)
+        else:
+            surface.blit(self.image, self.rect)
 
     def check_collision(self, other_sprite):
         if hasattr(other_sprite, 'collider_center') and hasattr(other_sprite, 'collider_radius'):
@@ -503,8 +595,11 @@ class Crawler(Unit, pygame.sprite.Sprite):
     def update(self, tile_size, x_offset=0, y_offset=0):
         self.update_rect_position(tile_size, x_offset, y_offset)
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+    def draw(self, surface, viewport=None):
+        if viewport is not None:
+            viewport.blit(surface, self.image, self.rect)
+        else:
+            surface.blit(self.image, self.rect)
     
     def update_rect_position(self, tile_size, x_offset, y_offset):
         offset_x = x_offset
@@ -533,9 +628,91 @@ class Crawler(Unit, pygame.sprite.Sprite):
             return self.rect.colliderect(other_sprite.rect)
 
 
+# --- Archetypes ---
+
+# (unit class, team, tile size, color, overrides) -> Archetype
+ARCHETYPES = {}
+
+
+class Archetype:
+    """A unit type's converted stats and sprite for one tile size, built once and cloned per spawn.
+
+    The prototype goes through the normal constructor, so the meters to
+    pixels conversions and the sprite drawing happen once per (type, team,
+    tile size, color, overrides) rather than once per unit. spawn() copies
+    the prototype's attributes onto a bare instance and gives it its own
+    rect and sprite group set; image surfaces are shared, which is safe as
+    nothing draws onto a unit's image after update_sprite() (rotation and
+    resizing assign new surfaces).
+    """
+
+    def __init__(self, unit_class, team, tile_size, color=None, **overrides):
+        if color is not None:
+            overrides["color"] = color
+        self.unit_class = unit_class
+        self.tile_size = tile_size
+        self.prototype = unit_class(grid_pos=(1, 1), team=team, tile_size=tile_size, **overrides)
+        state = dict(self.prototype.__dict__)
+        self._rect = state.pop("rect", None)
+        self._collider_center = state.pop("collider_center", None)
+        # Containers (the sprite's group set) must not be shared between units
+        self._containers = [key for key, value in state.items() if isinstance(value, (set, dict, list))]
+        self.state = state
+
+    def spawn(self, grid_pos, pixel_pos=None):
+        unit = self.unit_class.__new__(self.unit_class)
+        state = unit.__dict__
+        state.update(self.state)
+        for key in self._containers:
+            state[key] = self.state[key].copy()
+        if pixel_pos is None:
+            pixel_pos = unit.grid_to_pixel(grid_pos, self.tile_size)
+        unit.grid_pos = grid_pos
+        unit.pixel_pos = pixel_pos
+        unit.starting_pixel_pos = pixel_pos
+        if self._rect is not None:
+            # Constructors place the rect at the pixel position with no board offset
+            dx = int(pixel_pos[0]) - self._rect.x
+            dy = int(pixel_pos[1]) - self._rect.y
+            unit.rect = self._rect.move(dx, dy)
+            if self._collider_center is not None:
+                unit.collider_center = (self._collider_center[0] + dx, self._collider_center[1] + dy)
+        return unit
+
+
+def archetype(unit_class, team, tile_size, color=None, **overrides):
+    key = (unit_class, team, tile_size, color, tuple(sorted(overrides.items())))
+    try:
+        kind = ARCHETYPES.get(key)
+    except TypeError:
+        # Unhashable overrides (e.g. lists read from JSON) are not cached
+        return Archetype(unit_class, team, tile_size, color, **overrides)
+    if kind is None:
+        kind = ARCHETYPES[key] = Archetype(unit_class, team, tile_size, color, **overrides)
+    return kind
+
+
+def spawn_batch(unit_class, positions, team, tile_size=32, color=None, pixel_positions=None, **overrides):
+    """One new unit_class unit per grid position, cloned from its cached archetype."""
+    kind = archetype(unit_class, team, tile_size, color, **overrides)
+    if pixel_positions is None:
+        return [kind.spawn(grid_pos) for grid_pos in positions]
+    return [kind.spawn(grid_pos, pixel_pos) for grid_pos, pixel_pos in zip(positions, pixel_positions)]
+
+
 class CrawlerGroup:
-    GRID_SIZE = (2, 5)
-    def __init__(self, grid_pos, team, tile_size=32, color=(100, 200, 100)):
+    """Spawner for a 5x2 block of crawler pairs, with an optional level-of-detail mode.
+
+    With lod enabled the group starts aggregated: while no enemy is within
+    expand_distance tiles of the formation, simulation.step moves it as one
+    agent (one flow-field sample or nearest-enemy query, one step applied
+    to every member) instead of letting each crawler target, steer and
+    avoid on its own. On the first approach to contact the group expands
+    for good and its crawlers act individually from then on. Aggregation is
+    approximate: members move rigidly and drift from individual crawlers.
+    """
+    GRID_SIZE = (5, 2)
+    def __init__(self, grid_pos, team, tile_size=32, color=(100, 200, 100), lod=False, expand_distance=3):
         self.unit_type = "CrawlerGroup"
         self.start_grid_pos = grid_pos
         self.team = team
@@ -544,36 +721,83 @@ class CrawlerGroup:
         self.width = 5
         self.height = 2
         self.size = (self.width, self.height)
+        self.expand_distance = expand_distance  # Tiles between formation edge and nearest enemy
         self.crawlers = self._spawn_crawlers()
+        # Formation half-extent in tiles, from the block center to its corner
+        self.radius = math.hypot(self.width, self.height) / 2
+        self._moved_at = None
+        self.set_lod(lod)
+
+    def set_lod(self, enabled):
+        self.lod = enabled
+        self.aggregate = enabled
+
+    def expand(self):
+        self.aggregate = False
+
+    def act(self, enemies, tile_size, x_offset, y_offset, current_time, dt, flow_field=None):
+        """Move the whole formation one step; returns False once the group has expanded.
+
+        Called by simulation.step for every member, but moves the group only
+        once per tick.
+        """
+        if not self.aggregate:
+            return False
+        if self._moved_at == current_time:
+            return True
+        self._moved_at = current_time
+        members = [crawler for crawler in self.crawlers if crawler.alive]
+        if not members:
+            self.expand()
+            return False
+        # Formation center in board pixels
+        half = tile_size * 0.5
+        cx = sum(crawler.pixel_pos[0] for crawler in members) / len(members) + half
+        cy = sum(crawler.pixel_pos[1] for crawler in members) / len(members) + half
+        if flow_field is not None:
+            cell = flow_field.cell_of(cx, cy)
+            gap = flow_field.distance[cell] - self.radius
+            hx, hy = flow_field.heading_at_cell(cell)
+        else:
+            gap, hx, hy = self._nearest_enemy_gap(enemies, cx, cy, tile_size)
+        if gap <= self.expand_distance:
+            self.expand()
+            return False
+        step = members[0].movement_speed * dt
+        dx, dy = step * hx, step * hy
+        for crawler in members:
+            crawler.pixel_pos = (crawler.pixel_pos[0] + dx, crawler.pixel_pos[1] + dy)
+            crawler.update_rect_position(tile_size, x_offset, y_offset)
+            if crawler.cell_box is not None:
+                crawler.report_move()
+        return True
+
+    def _nearest_enemy_gap(self, enemies, cx, cy, tile_size):
+        """(gap in tiles from the formation edge, unit heading) to the nearest enemy center."""
+        best = None
+        best_dist = float("inf")
+        for enemy in enemies:
+            ex = enemy.pixel_pos[0] + enemy.size[0] * tile_size * 0.5
+            ey = enemy.pixel_pos[1] + enemy.size[1] * tile_size * 0.5
+            dist = math.hypot(ex - cx, ey - cy)
+            if dist < best_dist:
+                best, best_dist = (ex, ey), dist
+        if best is None or best_dist == 0:
+            return float("inf") if best is None else 0.0, 0.0, 0.0
+        gap = best_dist / tile_size - self.radius
+        return gap, (best[0] - cx) / best_dist, (best[1] - cy) / best_dist
 
     def _spawn_crawlers(self):
-        crawlers = []
-        for dy in range(self.height):
-            for dx in range(self.width):
-                grid_x = self.start_grid_pos[0] + dx
-                grid_y = self.start_grid_pos[1] + dy
-                # Top-left position
-                crawler_topleft = Crawler(
-                    grid_pos=(grid_x, grid_y),
-                    team=self.team,
-                    color=self.color,
-                    tile_size=self.tile_size,
-                    pixel_position=((grid_x - 1) * self.tile_size, (grid_y - 1) * self.tile_size)
-                )
-                crawlers.append(crawler_topleft)
-                # Bottom-right position: adjust pixel_pos directly
-                crawler_bottomright = Crawler(
-                    grid_pos=(grid_x, grid_y),
-                    team=self.team,
-                    color=self.color,
-                    tile_size=self.tile_size,
-                    pixel_position=((grid_x - 1) * self.tile_size, (grid_y - 1) * self.tile_size)
-                )
-                crawler_bottomright.pixel_pos = (
-                    crawler_bottomright.pixel_pos[0] + self.tile_size // 2,
-                    crawler_bottomright.pixel_pos[1] + self.tile_size // 2
-                )
-                crawlers.append(crawler_bottomright)
+        # Two crawlers per tile, both spawned at the tile's top-left corner
+        x0, y0 = self.start_grid_pos
+        positions = [(x0 + dx, y0 + dy) for dy in range(self.height) for dx in range(self.width) for _ in range(2)]
+        crawlers = spawn_batch(Crawler, positions, self.team, tile_size=self.tile_size, color=self.color)
+        # Bottom-right crawler of each pair: adjust pixel_pos directly
+        half = self.tile_size // 2
+        for crawler in crawlers[1::2]:
+            crawler.pixel_pos = (crawler.pixel_pos[0] + half, crawler.pixel_pos[1] + half)
+        for crawler in crawlers:
+            crawler.group = self
         return crawlers
 
     def get_units(self):
@@ -597,7 +821,7 @@ class CrawlerGroup:
 
 
 class Projectile:
-    def __init__(self, start_pos, target_unit, damage, speed=400, splash_range=0, all_units=None):
+    def __init__(self, start_pos, target_unit, damage, speed=400, splash_range=0, all_units=None, source=None):
         self.pos = list(start_pos)
         self.target_unit = target_unit
         self.damage = damage
@@ -605,6 +829,23 @@ class Projectile:
         self.active = True
         self.splash_range = splash_range
         self.all_units = all_units
+        self.source = source            # Firing unit, credited with the damage dealt
+        # Flight leg when scheduled on an ImpactQueue instead of being stepped (see game/impacts.py)
+        self.start = None
+        self.aim = None
+        self.fired_at = None
+        self.impact_time = None
+
+    def target_center(self):
+        if hasattr(self.target_unit, 'rect'):
+            return (self.target_unit.rect.x + self.target_unit.rect.width // 2,
+                    self.target_unit.rect.y + self.target_unit.rect.height // 2)
+        return self.target_unit.pixel_pos
+
+    def time_to_impact(self):
+        # Straight-line flight time to where the target is now
+        tx, ty = self.target_center()
+        return math.hypot(tx - self.pos[0], ty - self.pos[1]) / self.speed
 
     def update(self, dt):
         # if not self.active or not self.target_unit.alive:
@@ -619,36 +860,46 @@ class Projectile:
         dx = tx - self.pos[0]
         dy = ty - self.pos[1]
         dist = math.hypot(dx, dy)
-        if dist < self.speed * dt or dist == 0:
+        if dist <= self.speed * dt or dist == 0:
             # Reached target
-            self.pos[0], self.pos[1] = tx, ty
-            # Splash damage logic
-            if self.splash_range > 0 and self.all_units is not None:
-                for unit in self.all_units:
-                    if unit.alive and unit is not self.target_unit:
-                        # Use center of unit for distance
-                        if hasattr(unit, 'rect'):
-                            ux = unit.rect.x + unit.rect.width // 2
-                            uy = unit.rect.y + unit.rect.height // 2
-                        else:
-                            ux, uy = unit.pixel_pos
-                        splash_dist = math.hypot(ux - tx, uy - ty)
-                        if splash_dist <= self.splash_range:
-                            unit.take_damage(self.damage)
-            self.target_unit.take_damage(self.damage)
-            self.active = False
+            self.hit(tx, ty)
         else:
             self.pos[0] += self.speed * dt * dx / dist
             self.pos[1] += self.speed * dt * dy / dist
 
-    def draw(self, surface):
-        if self.active:
-            pygame.draw.circle(surface, (255, 255, 0), (int(self.pos[0]), int(self.pos[1])), 6)
-
-
-    def draw(self, surface):
+    def hit(self, tx, ty):
+        """Land at (tx, ty): damage the target and, with splash, every other unit in range."""
+        self.pos[0], self.pos[1] = tx, ty
+        # Splash damage logic: collect first, since kills swap-remove from the alive set being scanned
+        dealt = 0
+        if self.splash_range > 0 and self.all_units is not None:
+            splashed = []
+            for unit in self.all_units:
+                if unit.alive and unit is not self.target_unit:
+                    # Use center of unit for distance
+                    if hasattr(unit, 'rect'):
+                        ux = unit.rect.x + unit.rect.width // 2
+                        uy = unit.rect.y + unit.rect.height // 2
+                    else:
+                        ux, uy = unit.pixel_pos
+                    splash_dist = math.hypot(ux - tx, uy - ty)
+                    if splash_dist <= self.splash_range:
+                        splashed.append(unit)
+            for unit in splashed:
+                dealt += unit.take_damage(self.damage, self.source)
+        dealt += self.target_unit.take_damage(self.damage, self.source)
+        if self.source is not None:
+            self.source.damage_dealt += dealt
+        if EVENTS.debug:
+            EVENTS.emit(DEBUG, "impact", self, self.target_unit, self.damage)
+        self.active = False
+
+    def draw(self, surface, viewport=None):
         if self.active:
-            pygame.draw.circle(surface, (255, 255, 0), (int(self.pos[0]), int(self.pos[1])), 6)
+            if viewport is not None:
+                viewport.draw_circle(surface, (255, 255, 0), self.pos, 6)
+            else:
+                pygame.draw.circle(surface, (255, 255, 0), (int(self.pos[0]), int(self.pos[1])), 6)
 
     def update_sprite(self, tile_size):
         raise NotImplementedError("update_sprite must be implemented in subclasses")
\ No newline at end of file
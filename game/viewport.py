@@ -0,0 +1,131 @@
+import pygame
+
+
+class Viewport:
+    """Cached camera transform from board (simulation) pixels to the screen.
+
+    Units, projectiles and the board all live in board pixels: the layout
+    the board gets in its window at zoom 1, which is what the simulation
+    uses and what tile_size, x_offset and y_offset describe. Window resizes
+    and zoom/pan only change the render transform, never those coordinates.
+    The transform and the visible region are recomputed only when
+    resize(), set_zoom() or pan() is called. Culling is a rect test in
+    board pixels, done before any blit.
+    """
+
+    MIN_ZOOM = 0.5
+    MAX_ZOOM = 4.0
+
+    def __init__(self, board, screen_width=None, screen_height=None):
+        self.board = board
+        # Simulation metrics, fixed for the lifetime of the board
+        self.tile_size, self.x_offset, self.y_offset = board.metrics
+        self.board_width = self.tile_size * board.TOTAL_WIDTH
+        self.board_height = self.tile_size * board.TOTAL_HEIGHT
+        self.board_rect = pygame.Rect(self.x_offset, self.y_offset, self.board_width, self.board_height)
+
+        self.zoom = 1.0
+        self.pan_x = 0.0       # View center offset from the board center, in board pixels
+        self.pan_y = 0.0
+        self._scaled_images = {}
+        self.resize(screen_width or board.window_width, screen_height or board.window_height)
+
+    @property
+    def metrics(self):
+        """(tile_size, x_offset, y_offset) for Unit.update_rect_position and the simulation."""
+        return self.tile_size, self.x_offset, self.y_offset
+
+    # --- Invalidation ---
+
+    def resize(self, screen_width, screen_height):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        # Fit the board to the window like Board does on construction
+        fit_tile = self.board.layout(screen_width, screen_height)[0]
+        self.fit_scale = fit_tile / self.tile_size if self.tile_size else 1.0
+        self._update()
+
+    def set_zoom(self, zoom, anchor=None):
+        """Zoom around an optional screen-space anchor (e.g. the mouse) that stays fixed."""
+        zoom = max(self.MIN_ZOOM, min(self.MAX_ZOOM, zoom))
+        if zoom == self.zoom:
+            return
+        if anchor is not None:
+            wx, wy = self.screen_to_world(anchor)
+        self.zoom = zoom
+        self._update()
+        if anchor is not None:
+            ax, ay = self.screen_to_world(anchor)
+            self.pan(wx - ax, wy - ay)
+
+    def pan(self, dx, dy):
+        """Move the view center by (dx, dy) board pixels."""
+        self.pan_x += dx
+        self.pan_y += dy
+        self._update()
+
+    def reset(self):
+        self.zoom = 1.0
+        self.pan_x = self.pan_y = 0.0
+        self._update()
+
+    def _update(self):
+        old_scale = getattr(self, "scale", None)
+        self.scale = self.fit_scale * self.zoom
+        center_x = self.x_offset + self.board_width / 2 + self.pan_x
+        center_y = self.y_offset + self.board_height / 2 + self.pan_y
+        self.tx = self.screen_width / 2 - center_x * self.scale
+        self.ty = self.screen_height / 2 - center_y * self.scale
+        self.identity = self.scale == 1 and self.tx == 0 and self.ty == 0
+        # Screen bounds in board pixels, for culling without transforming every unit
+        left, top = self.screen_to_world((0, 0))
+        right, bottom = self.screen_to_world((self.screen_width, self.screen_height))
+        self.visible = pygame.Rect(int(left) - 1, int(top) - 1, int(right - left) + 2, int(bottom - top) + 2)
+        if self.scale != old_scale:
+            self._scaled_images.clear()
+
+    # --- Transform ---
+
+    def world_to_screen(self, pos):
+        return (pos[0] * self.scale + self.tx, pos[1] * self.scale + self.ty)
+
+    def screen_to_world(self, pos):
+        return ((pos[0] - self.tx) / self.scale, (pos[1] - self.ty) / self.scale)
+
+    def to_screen_rect(self, rect):
+        return pygame.Rect(int(rect.x * self.scale + self.tx), int(rect.y * self.scale + self.ty),
+                           int(rect.width * self.scale), int(rect.height * self.scale))
+
+    def screen_to_grid(self, pos):
+        """Board grid cell (0-based column, row) under a screen position."""
+        x, y = self.screen_to_world(pos)
+        return int((x - self.x_offset) // self.tile_size), int((y - self.y_offset) // self.tile_size)
+
+    # --- Culling and drawing ---
+
+    def is_visible(self, rect):
+        return self.visible.colliderect(rect)
+
+    def is_point_visible(self, pos, radius=0):
+        visible = self.visible
+        return (visible.left - radius <= pos[0] <= visible.right + radius
+                and visible.top - radius <= pos[1] <= visible.bottom + radius)
+
+    def blit(self, surface, image, rect):
+        if self.identity:
+            surface.blit(image, rect)
+            return
+        if self.scale == 1:
+            surface.blit(image, (rect.x + self.tx, rect.y + self.ty))
+            return
+        # Scaled copies are cached per source image until the scale changes
+        cached = self._scaled_images.get(id(image))
+        if cached is None or cached[0] is not image:
+            width, height = image.get_size()
+            scaled = pygame.transform.smoothscale(image, (max(1, int(width * self.scale)), max(1, int(height * self.scale))))
+            cached = self._scaled_images[id(image)] = (image, scaled)
+        surface.blit(cached[1], self.world_to_screen((rect.x, rect.y)))
+
+    def draw_circle(self, surface, color, pos, radius):
+        x, y = self.world_to_screen(pos)
+        pygame.draw.circle(surface, color, (int(x), int(y)), max(1, int(radius * self.scale)))
@@ -1,9 +1,18 @@
 
+import os
 import pygame
 import sys
 
 from game.board import Board  # Import the Board class
-from game.units import Building, Marksman, Arclight, Crawler, CrawlerGroup  # Import the Building class
+from game.units import Marksman, Arclight, CrawlerGroup  # Units offered in placement mode
+from game.event_log import EVENTS, DEBUG, INFO, WARNING, OFF
+from game.flow_field import FlowField
+from game.scenarios import DEFAULT_SCENARIO, Scenario, load_scenario, placement
+from game.simulation import step
+from game.alloc_profile import ALLOCS
+from game.alive_set import AliveSet
+from game.impacts import ImpactQueue
+from game.viewport import Viewport
 
 
 # Game window settings
@@ -12,70 +21,73 @@ WINDOW_HEIGHT = 600
 
 SIM_DT = 0.02  # Increase for faster simulation, decrease for slower (0.02 feels like a normal speed)
 FPS = 60
+SCENARIO_PATH = None  # Optional scenario JSON file to start from instead of DEFAULT_SCENARIO
+FLOW_FIELD_REFRESH = 1  # Rebuild the per-team flow fields every N ticks (None disables flow-field steering)
+EVENT_LOG_LEVEL = OFF  # Set to INFO or DEBUG to stream battle events to stdout (press L to cycle in game)
+CRAWLER_GROUP_LOD = False  # Move crawler groups as one formation until they near an enemy
+ANALYTIC_PROJECTILES = False  # Schedule projectile impacts when fired instead of stepping each projectile every tick
+ALLOC_SAMPLE_EVERY = 10  # When allocation tracking is on (press M), snapshot every Nth tick
+
+ZOOM_STEP = 1.1  # Zoom factor per mouse wheel notch (arrow keys pan, Home resets the view)
+PAN_KEYS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
 
 TEAM_COLOR_TOP = (40, 40, 240)  
 TEAM_COLOR_BOTTOM = (40, 240, 40)
+TEAM_COLORS = {0: TEAM_COLOR_BOTTOM, 1: TEAM_COLOR_TOP}  # The player places team 0, at the bottom
 
 team0_units = []
 team1_units = []
 projectiles = []
 
-team0 = []
-team1 = []
+team0 = AliveSet()
+team1 = AliveSet()
+flow_fields = None
+viewport = None
 
 
 def setup_game():
     # Setup/reset game state
-    global team0_units, team1_units, projectiles
+    global team0_units, team1_units, projectiles, flow_fields, viewport
     team0_units = []
     team1_units = []
-    projectiles = []
+    projectiles = ImpactQueue() if ANALYTIC_PROJECTILES else []
 
     board = Board(surface=screen, outline_top=TEAM_COLOR_TOP, outline_bottom=TEAM_COLOR_BOTTOM)
-    # building_top = Building(grid_pos=(9, 4), team=0, color=TEAM_COLOR_TOP)
-    # building_bottom = Building(grid_pos=(9, 16), team=1, color=TEAM_COLOR_BOTTOM)
-
-    team0_units.append(Building(grid_pos=(9, 17), team=1, tile_size=board.tile_size, color=TEAM_COLOR_BOTTOM))
-    team0_units.append(Marksman(grid_pos=(6, 16), team=0, color=TEAM_COLOR_BOTTOM, tile_size=board.tile_size))
-    team0_units.append(CrawlerGroup((8, 14), team=0, tile_size=board.tile_size, color=TEAM_COLOR_BOTTOM))
-    # team0_units.append(CrawlerGroup((8, 12), team=0, tile_size=board.tile_size, color=TEAM_COLOR_BOTTOM))
-    
-    team1_units.append(Building(grid_pos=(9, 3), team=0, tile_size=board.tile_size, color=TEAM_COLOR_TOP))
-    team1_units.append(Arclight(grid_pos=(6, 4), team=0, color=TEAM_COLOR_TOP, tile_size=board.tile_size))
-    team1_units.append(CrawlerGroup((6, 6), team=1, tile_size=board.tile_size, color=TEAM_COLOR_TOP))
-    # team1_units.append(CrawlerGroup((6, 8), team=1, tile_size=board.tile_size, color=TEAM_COLOR_TOP))
-
-    for unit in team0_units:
-        team0.extend(unit.get_units())
-    for unit in team1_units:
-        team1.extend(unit.get_units())
+    viewport = Viewport(board, *screen.get_size())
+    if FLOW_FIELD_REFRESH:
+        # One field per team: team0 flows toward team1 and vice versa
+        flow_fields = (FlowField(board.tile_size, refresh_interval=FLOW_FIELD_REFRESH),
+                       FlowField(board.tile_size, refresh_interval=FLOW_FIELD_REFRESH))
+    scenario = load_scenario(SCENARIO_PATH) if SCENARIO_PATH else DEFAULT_SCENARIO
+    team0_units, team1_units, units0, units1 = scenario.build(board.tile_size, colors=TEAM_COLORS)
+    for placed in team0_units + team1_units:
+        if hasattr(placed, "set_lod"):
+            placed.set_lod(CRAWLER_GROUP_LOD)
+    team0.extend(units0)
+    team1.extend(units1)
 
     return board
 
-def unit_placement(unit_type, grid_pos, team, color, board):
-    new_unit = unit_type(grid_pos=grid_pos, team=team, color=color, tile_size=board.tile_size)
-    team0_units.append(new_unit)
-    team0.extend(new_unit.get_units())
+def unit_placement(unit_type, grid_pos, team, board):
+    # Built like a one-placement scenario, so the unit joins the lists of the team it was made for
+    placed0, placed1, units0, units1 = Scenario([placement(unit_type, grid_pos[0], grid_pos[1], team)]).build(
+        board.tile_size, colors=TEAM_COLORS)
+    for new_unit in placed0 + placed1:
+        if hasattr(new_unit, "set_lod"):
+            new_unit.set_lod(CRAWLER_GROUP_LOD)
+        if EVENTS.active:
+            EVENTS.emit(INFO, "placement", new_unit, None, grid_pos)
+    team0_units.extend(placed0)
+    team1_units.extend(placed1)
+    team0.extend(units0)
+    team1.extend(units1)
 
 
 def play_mode(board, current_time):
 
     tile_size, x_offset, y_offset = get_board_metrics(board, mouse_pos=None)
 
-    for unit in team0 + team1:
-        unit.update_rect_position(tile_size, x_offset, y_offset)
-        # unit.draw(screen)
-    team0[:] = [unit for unit in team0 if getattr(unit, 'health', 1) > 0]
-    team1[:] = [unit for unit in team1 if getattr(unit, 'health', 1) > 0]
-    for unit in team0:
-        unit.act(team0, team1, tile_size, x_offset, y_offset, current_time, SIM_DT, projectiles)
-    for unit in team1:
-        unit.act(team1, team0, tile_size, x_offset, y_offset, current_time, SIM_DT, projectiles)
-    for projectile in projectiles[:]:
-        projectile.update(SIM_DT)
-        # projectile.draw(screen)
-        if not projectile.active:
-            projectiles.remove(projectile)
+    step(team0, team1, projectiles, tile_size, x_offset, y_offset, current_time, SIM_DT, flow_fields)
 
 
 def draw_scene(board, units, projectiles, start_button, placement_buttons):
@@ -83,21 +95,19 @@ def draw_scene(board, units, projectiles, start_button, placement_buttons):
     """
     # Draw everything
     screen.fill((30, 30, 30))
-    board.draw(screen)
-    # Compute tile size and board offsets (same as in play mode)
-    tile_size = min(int(screen.get_width() * 0.9) // board.TOTAL_WIDTH, int(screen.get_height() * 0.9) // board.TOTAL_HEIGHT)
-    board_width = tile_size * board.TOTAL_WIDTH
-    board_height = tile_size * board.TOTAL_HEIGHT
-    x_offset = (screen.get_width() - board_width) // 2
-    y_offset = (screen.get_height() - board_height) // 2
-    # Draw Units (handle groups that expose get_units)
+    board.draw(screen, viewport)
+    # Tile size and board offsets come from the cached viewport (same as in play mode)
+    tile_size, x_offset, y_offset = viewport.metrics
+    # Draw Units (handle groups that expose get_units), skipping anything off screen
     for unit in units:
         if hasattr(unit, 'update_rect_position'):
             unit.update_rect_position(tile_size, x_offset, y_offset)
-        unit.draw(screen)
+        if viewport.is_visible(unit.rect):
+            unit.draw(screen, viewport)
 
-    for projectile in projectiles[:]:
-            projectile.draw(screen)
+    for projectile in projectiles:
+        if viewport.is_point_visible(projectile.pos, 6):
+            projectile.draw(screen, viewport)
     
     # Draw UI
     start_button.draw(screen)
@@ -109,13 +119,7 @@ def draw_scene(board, units, projectiles, start_button, placement_buttons):
 
 # Helper function to get grid position and board parameters
 def get_board_metrics(board, mouse_pos=None):
-    tile_size = min(int(screen.get_width() * 0.9) // board.TOTAL_WIDTH, int(screen.get_height() * 0.9) // board.TOTAL_HEIGHT)
-    board_width = tile_size * board.TOTAL_WIDTH
-    board_height = tile_size * board.TOTAL_HEIGHT
-    x_offset = (screen.get_width() - board_width) // 2
-    y_offset = (screen.get_height() - board_height) // 2
-
-    return tile_size, x_offset, y_offset
+    return viewport.metrics
 
 
 
@@ -146,6 +150,9 @@ def main():
     clock = pygame.time.Clock()
 
     board = setup_game()
+    EVENTS.set_level(EVENT_LOG_LEVEL)
+    ALLOCS.sample_every = ALLOC_SAMPLE_EVERY
+    log_levels = [OFF, INFO, DEBUG]
 
     # --- Placement UI setup ---
     font = pygame.font.SysFont(None, 24)
@@ -164,6 +171,7 @@ def main():
         placement_buttons.append(Button(rect, label, font))
     placement_mode = None
     round_active = False
+    preview = None  # (mode, hovered tile) last reported as a placement_preview event
 
     sim_time = 0.0
 
@@ -174,9 +182,34 @@ def main():
             if event.type == pygame.QUIT:
                     running = False
                     break
+            elif event.type == pygame.MOUSEWHEEL:
+                viewport.set_zoom(viewport.zoom * ZOOM_STEP ** event.y, anchor=pygame.mouse.get_pos())
+            elif event.type == pygame.VIDEORESIZE:
+                viewport.resize(event.w, event.h)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_g:
                     board.toggle_grid()
+                elif event.key in PAN_KEYS:
+                    dx, dy = PAN_KEYS[event.key]
+                    viewport.pan(dx * viewport.tile_size, dy * viewport.tile_size)
+                elif event.key == pygame.K_HOME:
+                    viewport.reset()
+                elif event.key == pygame.K_m:
+                    # Toggle allocation tracking; switching it off reports to the event log, or to stdout while the log is off
+                    if not ALLOCS.toggle():
+                        if EVENTS.active:
+                            for phase, stats in ALLOCS.summary():
+                                EVENTS.emit(INFO, "allocations", phase, ALLOCS.sampled_ticks, stats)
+                            for (filename, lineno), (blocks, size) in ALLOCS.top_sites():
+                                EVENTS.emit(INFO, "allocation_site", f"{os.path.relpath(filename)}:{lineno}", None,
+                                            {"blocks": blocks, "bytes": size})
+                        else:
+                            print(ALLOCS.report())
+                        ALLOCS.reset()
+                elif event.key == pygame.K_l:
+                    # Cycle the event log level: off -> info -> debug
+                    next_level = log_levels[(log_levels.index(EVENTS.level) + 1) % len(log_levels)] if EVENTS.level in log_levels else OFF
+                    EVENTS.set_level(next_level)
         if game_state == "placement":
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
@@ -201,8 +234,6 @@ def main():
                             # Get the unit *class* associated with the button
                             unit_class = list(placement_types.values())[i]
 
-                            print(unit_class)
-                            
                             # Store the placement_mode as the class itself for easy access, 
                             # or just the label as before
                             placement_mode = list(placement_types.keys())[i] 
@@ -211,11 +242,13 @@ def main():
                             try:
                                 # Access the static GRID_SIZE attribute on the class
                                 unit_grid_size = unit_class.GRID_SIZE 
-                                print(f"Selected unit size: {unit_grid_size}")
+                                if EVENTS.active:
+                                    EVENTS.emit(INFO, "select", unit_class, None, unit_grid_size)
                                 # You can store this in a global variable if needed for drawing/checks 
                                 # (e.g., current_unit_size = unit_grid_size)
                             except AttributeError:
-                                print(f"Warning: {placement_mode} class does not have a GRID_SIZE attribute.")
+                                if EVENTS.active:
+                                    EVENTS.emit(WARNING, "select", unit_class, None, "missing GRID_SIZE")
 
                             button_clicked = True
                             break
@@ -223,16 +256,12 @@ def main():
                     # Handle unit placement on mouse click
                     if placement_mode and not button_clicked:
                         # Compute grid position from mouse click
-                        tile_size, x_offset, y_offset = get_board_metrics(board, mouse_pos=event.pos)
-                        mx, my = event.pos
-                        grid_x = (mx - x_offset) // tile_size
-                        grid_y = (my - y_offset) // tile_size
-                        grid_pos = (grid_x, grid_y)
+                        grid_pos = viewport.screen_to_grid(event.pos)
 
                         # Find the correct function from placement_types and place the unit
                         for label, create_func in placement_types.items():
                             if label == placement_mode:
-                                unit_placement(create_func, grid_pos=grid_pos, team=1, color=TEAM_COLOR_BOTTOM, board=board)
+                                unit_placement(create_func.__name__, grid_pos=grid_pos, team=0, board=board)
                                 placement_mode = None # Clear mode after placement
                                 break
 
@@ -252,7 +281,12 @@ def main():
                 # 2. Get the size
                 if unit_class_to_place and hasattr(unit_class_to_place, 'GRID_SIZE'):
                     size_w, size_h = unit_class_to_place.GRID_SIZE
-                    print(f"Placing unit of type: {placement_mode} with size: {size_w}x{size_h}")
+                    if EVENTS.debug:
+                        # Only report the preview when the selection or the hovered tile changes
+                        hovered = viewport.screen_to_grid(pygame.mouse.get_pos())
+                        if preview != (placement_mode, hovered):
+                            preview = (placement_mode, hovered)
+                            EVENTS.emit(DEBUG, "placement_preview", unit_class_to_place, None, (hovered, (size_w, size_h)))
 
                 
 
@@ -267,6 +301,7 @@ def main():
 
         draw_scene(board, team0 + team1, projectiles, start_button, placement_buttons)
 
+    EVENTS.close()
     pygame.quit()
     sys.exit()
 
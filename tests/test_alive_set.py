@@ -0,0 +1,49 @@
+from game.alive_set import SLOT_MASK, AliveSet
+from game.units import Crawler, Projectile
+
+
+def crawlers(positions, team=1, tile_size=32):
+    units = [Crawler(pos, team, tile_size=tile_size) for pos in positions]
+    for unit in units:
+        unit.update_rect_position(tile_size, 0, 0)
+    return units
+
+
+def test_swap_remove_keeps_other_handles_valid():
+    units = crawlers([(x, 1) for x in range(1, 6)])
+    alive = AliveSet(units)
+    handles = [unit.handle for unit in units]
+    units[1].take_damage(units[1].health)
+    assert len(alive) == 4 and units[1] not in alive
+    assert alive.get(handles[1]) is None
+    for unit, handle in zip(units, handles):
+        if unit is not units[1]:
+            assert alive.get(handle) is unit
+    assert sorted(map(id, alive)) == sorted(id(unit) for unit in units if unit.alive)
+
+
+def test_stale_handle_is_none_after_its_slot_is_reused():
+    first, second = crawlers([(1, 1), (2, 1)])
+    alive = AliveSet([first])
+    stale = first.handle
+    first.take_damage(first.health)
+    alive.add(second)
+    # The freed slot is reused at a new generation
+    assert second.handle & SLOT_MASK == stale & SLOT_MASK
+    assert second.handle != stale
+    assert alive.get(stale) is None
+    assert alive.get(second.handle) is second
+
+
+def test_splash_kills_during_a_scan_of_the_same_set():
+    # A tight cluster: one splash shot kills every crawler in it
+    tile_size = 32
+    cluster = crawlers([(x, y) for x in range(1, 4) for y in range(1, 3)], tile_size=tile_size)
+    bystander = crawlers([(15, 15)], tile_size=tile_size)[0]
+    alive = AliveSet(cluster + [bystander])
+    target = cluster[0]
+    shot = Projectile(list(target.pixel_pos), target, damage=10000, splash_range=4 * tile_size, all_units=alive)
+    shot.hit(*shot.target_center())
+    assert not any(unit.alive for unit in cluster)
+    assert list(alive) == [bystander]
+    assert alive.get(bystander.handle) is bystander
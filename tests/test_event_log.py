@@ -0,0 +1,46 @@
+import io
+import json
+
+from game.event_log import EVENTS, DEBUG, INFO, OFF, EventLog
+from game.scenarios import DEFAULT_SCENARIO
+from game.simulation import Battle
+
+
+def test_headless_battle_stamps_event_times_and_credits_kills():
+    stream = io.StringIO()
+    EVENTS.stream = stream
+    EVENTS.set_level(DEBUG)
+    try:
+        Battle(DEFAULT_SCENARIO).run(max_time=10)
+    finally:
+        EVENTS.close()
+        EVENTS.set_level(OFF)
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert any(event["t"] > 0 for event in events)
+    kills = [event for event in events if event["event"] == "kill"]
+    assert kills and all(event["source"] is not None for event in kills)
+
+
+class _WrappingSlots(list):
+    """Slot list that lets a writer lap the ring buffer while the reader copies it."""
+
+    def __init__(self, values, log):
+        super().__init__(values)
+        self.log = log
+
+    def __getitem__(self, i):
+        log, self.log = self.log, None
+        if log is not None:
+            for k in range(log.capacity):
+                log.emit(INFO, "late", value=100 + k)
+        return super().__getitem__(i)
+
+
+def test_take_drops_slots_overwritten_while_copying():
+    log = EventLog(capacity=8, level=INFO)
+    for k in range(4):
+        log.emit(INFO, "early", value=k)
+    log._values = _WrappingSlots(log._values, log)
+    # Every early slot was lapped by a late emit, so none of them may come back half-overwritten
+    assert log._take() == []
+    assert log.dropped == 4
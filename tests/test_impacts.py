@@ -0,0 +1,68 @@
+from game.impacts import ImpactQueue
+from game.simulation import Battle
+from game.units import Building, Projectile
+
+from test_simulation import MIXED
+
+DT = 0.02
+
+
+def target(grid_pos=(10, 10), tile_size=32):
+    unit = Building(grid_pos, 1, tile_size=tile_size)
+    unit.update_rect_position(tile_size, 0, 0)
+    return unit
+
+
+def landing_tick(projectiles, advance):
+    for tick in range(1, 1000):
+        advance(tick * DT)
+        if not any(p.active for p in projectiles):
+            return tick
+    return None
+
+
+def test_analytic_and_stepped_impacts_land_on_the_same_tick():
+    stepped_target, analytic_target = target(), target()
+    cx, cy = stepped_target.rect.center
+    start = (cx - 150, cy - 200)  # 250 px away: 31.25 ticks of flight at 400 px/s
+    stepped = Projectile(start, stepped_target, damage=10)
+    analytic = Projectile(start, analytic_target, damage=10)
+    queue = ImpactQueue()
+    queue.append(analytic)
+    assert landing_tick([stepped], lambda now: stepped.update(DT)) == 32
+    assert landing_tick([analytic], queue.advance) == 32
+    assert stepped_target.health == analytic_target.health
+
+
+def test_moving_target_is_re_estimated():
+    unit = target()
+    cx, cy = unit.rect.center
+    queue = ImpactQueue()
+    shot = Projectile((cx - 200, cy), unit, damage=10)
+    queue.append(shot)
+    first = queue.next_impact()
+    # The target walks a tile away before the shot arrives
+    unit.pixel_pos = (unit.pixel_pos[0] + 32, unit.pixel_pos[1])
+    unit.update_rect_position(32, 0, 0)
+    assert queue.advance(first) == 0
+    assert queue.retargets == 1
+    assert queue.next_impact() > first
+    assert queue.advance(queue.next_impact()) == 1
+    assert unit.health < unit.max_health
+
+
+def test_adaptive_steps_land_on_scheduled_impacts():
+    battle = Battle(MIXED, adaptive=True, analytic_projectiles=True)
+    fixed = Battle(MIXED, analytic_projectiles=True).run()
+    impacts = 0
+    while battle.time < 120 and not battle.is_over():
+        now, due = battle.time, battle.projectiles.next_impact()
+        battle.step()
+        if due is not None:
+            # A step never jumps past a scheduled impact by more than the fine step it may be forced to take
+            assert battle.time <= max(due, now + battle.dt) + 1e-6
+            if battle.time >= due - 1e-9:
+                impacts += 1
+                assert battle.projectiles.next_impact() is None or battle.projectiles.next_impact() > due
+    assert impacts > 0
+    assert battle.result().winner == fixed.winner
@@ -0,0 +1,38 @@
+import numpy as np
+
+from game.observation import ObservationEncoder
+from game.scenarios import DEFAULT_SCENARIO
+from game.simulation import Battle
+
+
+def test_incremental_matches_fresh_encode_after_long_battle():
+    battle = Battle(DEFAULT_SCENARIO)
+    encoder = ObservationEncoder(battle.tile_size, battle.x_offset, battle.y_offset)
+    for _ in range(600):
+        battle.step()
+        encoder.update(battle.team0, battle.team1, battle.projectiles, battle.time)
+        if battle.is_over():
+            break
+    fresh = ObservationEncoder(battle.tile_size, battle.x_offset, battle.y_offset)
+    expected = fresh.encode(battle.team0, battle.team1, battle.projectiles, battle.time)
+    # Cells that are empty in a fresh encode hold no rounding residue
+    assert not encoder.obs[expected == 0].any()
+    np.testing.assert_allclose(encoder.obs, expected, rtol=0, atol=1e-6)
+
+
+def test_update_visits_only_units_the_simulation_reported():
+    battle = Battle(DEFAULT_SCENARIO)
+    encoder = ObservationEncoder(battle.tile_size, battle.x_offset, battle.y_offset)
+    encoder.update(battle.team0, battle.team1, battle.projectiles, battle.time)
+    alive = len(battle.team0) + len(battle.team1)
+    reported = 0
+    for _ in range(20):
+        battle.step()
+        # Before contact only units crossing into another tile report a change
+        reported += len(encoder._changed)
+        encoder.update(battle.team0, battle.team1, battle.projectiles, battle.time)
+    assert reported < 20 * alive / 4
+    fresh = ObservationEncoder(battle.tile_size, battle.x_offset, battle.y_offset)
+    np.testing.assert_array_equal(encoder.obs, fresh.encode(battle.team0, battle.team1, battle.projectiles, battle.time))
+    encoder.release()
+    assert all(unit.changes is None for unit in battle.team0)
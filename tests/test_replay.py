@@ -0,0 +1,45 @@
+from game.replay import compare, record, reference_engine
+from game.simulation import Battle
+
+from test_simulation import MIXED
+
+# Before first contact every unit just walks, so a finer step stays within a fraction of a pixel
+APPROACH_TIME = 0.8
+
+
+def fine_engine(scenario):
+    return Battle(scenario, flow_field_refresh=0, dt=0.01)
+
+
+class SteppedOnly:
+    """An engine that can only step(), at its own dt."""
+
+    def __init__(self, scenario):
+        self.battle = fine_engine(scenario)
+        self.roster0, self.roster1 = self.battle.roster0, self.battle.roster1
+
+    @property
+    def time(self):
+        return self.battle.time
+
+    def step(self):
+        self.battle.step()
+
+    def is_over(self):
+        return self.battle.is_over()
+
+
+def test_reference_replays_exactly():
+    golden = record(MIXED, max_time=2.0)
+    assert compare(golden, MIXED, reference_engine, max_time=2.0) is None
+
+
+def test_engines_with_other_steps_are_compared_at_matching_times():
+    golden = record(MIXED, max_time=APPROACH_TIME)
+    assert golden.ticks == 40
+    assert compare(golden, MIXED, fine_engine, tolerance=0.5, max_time=APPROACH_TIME) is None
+    assert compare(golden, MIXED, SteppedOnly, tolerance=0.5, max_time=APPROACH_TIME) is None
+    # Adaptive steps re-aim less often, so crawlers drift a few pixels but stay aligned in time
+    adaptive = compare(golden, MIXED, lambda s: Battle(s, flow_field_refresh=0, adaptive=True),
+                       tolerance=(0, 4), max_time=APPROACH_TIME, stride=10)
+    assert adaptive is None
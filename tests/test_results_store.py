@@ -0,0 +1,18 @@
+from game.results_store import ResultsStore
+from game.simulation import BattleResult
+
+
+def test_query_results_carry_their_full_scenario_ids(tmp_path):
+    # Optimizer ids are placement tuples, longer than any fixed-width column would hold
+    ids = [str((("Marksman", x, 17), ("Arclight", 10, 13), ("CrawlerGroup", 6, 11))) for x in range(7)]
+    with ResultsStore(tmp_path, chunk_rows=4) as store:
+        for i, scenario_id in enumerate(ids[:5]):
+            store.append(BattleResult(scenario_id, i % 2, 10, 1.0, (1, 2), (0.5, 0.5)))
+    # Reopening resumes the partly filled second chunk
+    with ResultsStore(tmp_path) as store:
+        for scenario_id in ids[5:]:
+            store.append(BattleResult(scenario_id, 1, 10, 1.0, (1, 2), (0.5, 0.5)))
+    store = ResultsStore(tmp_path)
+    assert store.select()["scenario_id"].tolist() == ids
+    assert store.select(lambda chunk: chunk["winner"] == 1)["scenario_id"].tolist() == [ids[i] for i in (1, 3, 5, 6)]
+    assert store.select(store.scenario(ids[2]))["scenario_id"].tolist() == [ids[2]]
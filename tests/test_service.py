@@ -0,0 +1,17 @@
+from game.scenarios import DEFAULT_SCENARIO
+from game.service import SimulationService
+
+
+def test_job_submitted_behind_a_large_one_is_not_starved():
+    service = SimulationService(workers=1, max_in_flight=1)
+    try:
+        scenario = DEFAULT_SCENARIO.to_dict()
+        large = service.submit([scenario] * 30, {"max_time": 1})
+        small = service.submit([scenario] * 2, {"max_time": 1})
+        assert len(list(small.stream(timeout=60))) == 2
+        # Round robin: the large job got about one battle per battle of the small job
+        assert len(large.results) <= 4
+        assert len(list(large.stream(timeout=60))) == 30
+        assert large.errors == small.errors == 0
+    finally:
+        service.close()
@@ -0,0 +1,81 @@
+import math
+import random
+
+from game.scenarios import Scenario, footprint, placement
+from game.simulation import Battle
+
+# Mean remaining-health difference allowed between adaptive runs and the fine fixed step.
+# Fixed runs at dt 0.01 and 0.02 already differ by about 0.03 on average (up to 0.2 on a
+# single layout) as the order of contacts shifts, so one layout may stray a little further.
+HEALTH_TOLERANCE = 0.05
+
+MIXED = Scenario([
+    placement("Building", 9, 17, 0), placement("Building", 9, 3, 1),
+    placement("Marksman", 13, 17, 0), placement("CrawlerGroup", 6, 11, 0), placement("Arclight", 10, 13, 0),
+    placement("Marksman", 11, 7, 1), placement("Arclight", 6, 7, 1), placement("CrawlerGroup", 12, 6, 1),
+], "mixed")
+
+
+def random_layout(seed, per_side=3):
+    rng = random.Random(seed)
+    placements = [placement("Building", 9, 17, 0), placement("Building", 9, 3, 1)]
+    for team, (top, bottom) in ((0, (11, 18)), (1, (2, 9))):
+        for _ in range(per_side):
+            unit_type = rng.choice(("Marksman", "Arclight", "CrawlerGroup"))
+            w, h = footprint(unit_type)
+            placements.append(placement(unit_type, rng.randint(1, 19 - w), rng.randint(top, bottom - h + 1), team))
+    return Scenario(placements, f"layout-{seed}")
+
+
+def health_error(scenario):
+    fine = Battle(scenario).run()
+    adaptive = Battle(scenario, adaptive=True).run()
+    assert adaptive.winner == fine.winner
+    assert adaptive.ticks < fine.ticks
+    return max(abs(a - f) for a, f in zip(adaptive.health, fine.health))
+
+
+def test_adaptive_matches_fine_step_with_crawlers_on_the_flow_field():
+    assert health_error(MIXED) <= HEALTH_TOLERANCE
+
+
+def test_adaptive_stays_within_tolerance_of_fine_step():
+    errors = [health_error(random_layout(seed)) for seed in range(6)]
+    assert sum(errors) / len(errors) <= HEALTH_TOLERANCE
+    assert max(errors) <= 2 * HEALTH_TOLERANCE
+
+
+# Group LOD moves a formation rigidly along one heading, so members drift from where
+# individually steered crawlers would be; these bound that drift and its effect on outcomes.
+LOD_DRIFT_TILES = 3.0
+LOD_HEALTH_TOLERANCE = 0.1
+
+
+def lod_drift(scenario):
+    """Largest member offset, in tiles, between LOD and detailed groups while any group is aggregated."""
+    detailed, lod = Battle(scenario), Battle(scenario, group_lod=True)
+    pairs = [(d, g) for d, g in zip(detailed.team0_units + detailed.team1_units, lod.team0_units + lod.team1_units)
+             if hasattr(g, "set_lod")]
+    drift = 0.0
+    while any(g.aggregate for _, g in pairs) and not lod.is_over():
+        detailed.step()
+        lod.step()
+        for d, g in pairs:
+            for a, b in zip(d.crawlers, g.crawlers):
+                drift = max(drift, math.hypot(a.pixel_pos[0] - b.pixel_pos[0], a.pixel_pos[1] - b.pixel_pos[1]))
+    return drift / lod.tile_size
+
+
+def lod_health_error(scenario):
+    detailed = Battle(scenario).run()
+    lod = Battle(scenario, group_lod=True).run()
+    assert lod.winner == detailed.winner
+    return max(abs(a - b) for a, b in zip(lod.health, detailed.health))
+
+
+def test_group_lod_stays_within_tolerance_of_detailed_crawlers():
+    scenarios = [MIXED] + [random_layout(seed) for seed in (2, 3, 4, 5)]
+    assert max(lod_drift(scenario) for scenario in scenarios) <= LOD_DRIFT_TILES
+    errors = [lod_health_error(scenario) for scenario in scenarios]
+    assert sum(errors) / len(errors) <= LOD_HEALTH_TOLERANCE
+    assert max(errors) <= 2 * LOD_HEALTH_TOLERANCE